@@ -0,0 +1,218 @@
+import heapq
+import sys
+import time
+from gamelogic import GameState, ATE, MOVED
+
+MOVES = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+FOOD_CANDIDATES = 3
+REPAIR_BUDGET = 512
+RISK = 0.25
+
+class Autopilot:
+    # steers toward the nearest food with A*. The route is kept between
+    # decisions and only re-searched when the target is gone, a closer food
+    # appears, or the next cell got blocked, in which case just the blocked
+    # stretch is patched before falling back to a fresh search. With an
+    # inference engine, cells whose bomb probability exceeds `risk` are
+    # treated as walls.
+    def __init__(self, state, avoid_bombs=None, inference=None, risk=RISK):
+        self.state = state
+        self.avoid_bombs = state.trial if avoid_bombs is None else avoid_bombs
+        self.inference = inference
+        self.risk = risk
+        self.route = []
+        self.where = {}
+        self.target = None
+        self.length_seen = 0
+        self.bomb_cells = None
+        self.bomb_source = None
+        self.searches = 0
+        self.repairs = 0
+
+    def _cell(self, pos):
+        return pos[1] * self.state.width + pos[0]
+
+    def _bombs(self):
+        bombs = self.state.bombs
+        if bombs is not self.bomb_source:
+            self.bomb_source = bombs
+            self.bomb_cells = {self._cell(pos) for pos in bombs} if self.avoid_bombs else set()
+        return self.bomb_cells
+
+    def _blocked(self, cell):
+        # the engine counts the current tail as body too, so it stays blocked
+        if self.state.snake.contains_cell(cell) or cell in self.bomb_cells:
+            return True
+        return self.inference is not None and self.inference.probability((cell % self.state.width, cell // self.state.width)) > self.risk
+
+    def _neighbours(self, cell):
+        width, height = self.state.width, self.state.height
+        x, y = cell % width, cell // width
+        if y > 0:
+            yield cell - width
+        if y < height - 1:
+            yield cell + width
+        if x > 0:
+            yield cell - 1
+        if x < width - 1:
+            yield cell + 1
+
+    def _search(self, start, goal, budget=None):
+        width = self.state.width
+        gx, gy = goal % width, goal // width
+        best = {start: 0}
+        came = {start: -1}
+        # ties on f go to the deeper node, so open ground costs about one
+        # expansion per step instead of the whole diamond around the goal
+        heap = [(abs(start % width - gx) + abs(start // width - gy), 0, start)]
+        expanded = 0
+        self.searches += 1
+        while heap:
+            _, depth, cell = heapq.heappop(heap)
+            dist = -depth
+            if cell == goal:
+                path = []
+                while cell != -1:
+                    path.append(cell)
+                    cell = came[cell]
+                path.reverse()
+                return path
+            if dist > best[cell]:
+                continue
+            expanded += 1
+            if budget is not None and expanded > budget:
+                return None
+            for nxt in self._neighbours(cell):
+                if nxt != goal and self._blocked(nxt):
+                    continue
+                if dist + 1 < best.get(nxt, dist + 2):
+                    best[nxt] = dist + 1
+                    came[nxt] = cell
+                    h = abs(nxt % width - gx) + abs(nxt // width - gy)
+                    heapq.heappush(heap, (dist + 1 + h, -dist - 1, nxt))
+        return None
+
+    def _set_route(self, route):
+        self.route = route
+        self.where = {cell: i for i, cell in enumerate(route)}
+        self.target = route[-1] if route else None
+
+    def _plan(self, head):
+        state = self.state
+        width = state.width
+        hx, hy = head % width, head // width
+        foods = sorted(state.food_set, key=lambda pos: abs(pos[0] - hx) + abs(pos[1] - hy))
+        self.length_seen = state.snake.length
+        for pos in foods[:FOOD_CANDIDATES]:
+            goal = self._cell(pos)
+            if goal in self.bomb_cells:
+                continue
+            route = self._search(head, goal)
+            if route:
+                self._set_route(route)
+                return True
+        self._set_route([])
+        return False
+
+    def _closer_food(self, head, remaining):
+        width = self.state.width
+        hx, hy = head % width, head // width
+        return any(abs(x - hx) + abs(y - hy) < remaining for x, y in self.state.food_set)
+
+    def _repair(self, i):
+        # reconnect to the first clear cell after the blocked stretch, with a
+        # bounded search; the rest of the route is kept as is
+        route = self.route
+        j = i + 1
+        while j < len(route) and self._blocked(route[j]):
+            j += 1
+        if j >= len(route):
+            return False
+        patch = self._search(route[i], route[j], REPAIR_BUDGET)
+        if patch is None:
+            return False
+        self.repairs += 1
+        self._set_route(patch + route[j + 1:])
+        return True
+
+    def _fallback(self, head):
+        # no route to food: take the open neighbour with the most room
+        best = None
+        best_room = -1
+        for cell in self._neighbours(head):
+            if self._blocked(cell):
+                continue
+            room = sum(1 for nxt in self._neighbours(cell) if nxt != head and not self._blocked(nxt))
+            if room > best_room:
+                best, best_room = cell, room
+        return best
+
+    def _direction(self, head, cell):
+        width = self.state.width
+        return (cell % width - head % width, cell // width - head // width)
+
+    def decide(self):
+        state = self.state
+        if state.over:
+            return None
+        self._bombs()
+        if self.inference is not None:
+            self.inference.sync(state)
+        head = self._cell(state.snake.head_coordinates())
+        i = self.where.get(head)
+        stale = (i is None or i + 1 >= len(self.route)
+                 or self.target is None
+                 or (self.target % state.width, self.target // state.width) not in state.food_set)
+        # food only respawns when something is eaten, which grows the snake
+        if not stale and state.snake.length != self.length_seen:
+            self.length_seen = state.snake.length
+            stale = self._closer_food(head, len(self.route) - 1 - i)
+        if not stale and self._blocked(self.route[i + 1]):
+            stale = not self._repair(i)
+            i = 0
+        if stale:
+            self._plan(head)
+            i = 0
+        if self.route:
+            return self._direction(head, self.route[i + 1])
+        cell = self._fallback(head)
+        if cell is None:
+            return MOVES[0]
+        return self._direction(head, cell)
+
+    def step(self):
+        direction = self.decide()
+        if direction is None:
+            return self.state.outcome
+        return self.state.step(direction)
+
+def benchmark(width, height, games, food_count=3, bomb_count=5, trial=True, max_moves=100000):
+    decisions = 0
+    scores = []
+    start = time.perf_counter()
+    for seed in range(games):
+        state = GameState(food_count, bomb_count, trial=trial, width=width, height=height, seed=seed)
+        pilot = Autopilot(state, avoid_bombs=True)
+        eaten = 0
+        for _ in range(max_moves):
+            outcome = pilot.step()
+            decisions += 1
+            if outcome == ATE:
+                eaten += 1
+            elif outcome != MOVED:
+                break
+        scores.append(eaten)
+    elapsed = time.perf_counter() - start
+    return decisions, elapsed, scores
+
+def main(argv):
+    width = int(argv[1]) if len(argv) > 1 else 100
+    height = int(argv[2]) if len(argv) > 2 else width
+    games = int(argv[3]) if len(argv) > 3 else 5
+    decisions, elapsed, scores = benchmark(width, height, games)
+    print(f"{games} games on {width}x{height}: {decisions} decisions in {elapsed:.2f}s "
+          f"({decisions / elapsed:.0f}/s), food eaten per game {sum(scores) / len(scores):.1f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,132 @@
+import numpy as np
+from gamelogic import BOARD_WIDTH, BOARD_HEIGHT
+
+EMPTY = 0
+SNAKE = 1
+FOOD = 2
+BOMB = 3
+
+# action index -> (dx, dy), same order as the W/S/A/D keys
+ACTIONS = np.array([(0, -1), (0, 1), (-1, 0), (1, 0)], dtype=np.int64)
+
+MOVED = 0
+ATE = 1
+HIT_WALL = 2
+HIT_SELF = 3
+HIT_BOMB = 4
+FINISHED = 5
+
+class BatchGame:
+    def __init__(self, n_games, food_count=3, bomb_count=5, width=BOARD_WIDTH, height=BOARD_HEIGHT, seed=None):
+        self.n = n_games
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.food_count = food_count
+        self.bomb_count = bomb_count
+        self.rng = np.random.default_rng(seed)
+        self.grid = np.zeros((n_games, self.cells), dtype=np.int8)
+        self.body = np.zeros((n_games, self.cells), dtype=np.int32)
+        self.head_idx = np.zeros(n_games, dtype=np.int64)
+        self.length = np.zeros(n_games, dtype=np.int64)
+        self.score = np.zeros(n_games, dtype=np.int64)
+        self.alive = np.zeros(n_games, dtype=bool)
+        self.moves = np.zeros(n_games, dtype=np.int64)
+        self.reset()
+
+    def boards(self):
+        return self.grid.reshape(self.n, self.height, self.width)
+
+    def reset(self, mask=None):
+        if mask is None:
+            rows = np.arange(self.n)
+        else:
+            rows = np.flatnonzero(mask)
+        if rows.size == 0:
+            return
+        start = (self.height // 2) * self.width + self.width // 2
+        self.grid[rows] = EMPTY
+        self.grid[rows, start] = SNAKE
+        self.body[rows, 0] = start
+        self.head_idx[rows] = 0
+        self.length[rows] = 1
+        self.score[rows] = 0
+        self.moves[rows] = 0
+        self.alive[rows] = True
+        self._place(rows, FOOD, self.food_count)
+        self._place(rows, BOMB, self.bomb_count)
+
+    def _place(self, rows, kind, count):
+        free = self.grid[rows] == EMPTY
+        k = min(count, int(free.sum(axis=1).min()))
+        if k <= 0:
+            return
+        keys = self.rng.random(free.shape)
+        keys[~free] = 2.0
+        picks = np.argpartition(keys, k - 1, axis=1)[:, :k]
+        self.grid[rows[:, None], picks] = kind
+
+    def heads(self):
+        flat = self.body[np.arange(self.n), self.head_idx]
+        return flat % self.width, flat // self.width
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int64)
+        outcome = np.full(self.n, FINISHED, dtype=np.int8)
+        rows = np.flatnonzero(self.alive)
+        if rows.size == 0:
+            return outcome
+
+        head = self.body[rows, self.head_idx[rows]]
+        delta = ACTIONS[actions[rows]]
+        nx = head % self.width + delta[:, 0]
+        ny = head // self.width + delta[:, 1]
+
+        wall = (nx < 0) | (nx >= self.width) | (ny < 0) | (ny >= self.height)
+        target = np.where(wall, 0, ny * self.width + nx)
+        cell = self.grid[rows, target]
+        hit_self = ~wall & (cell == SNAKE)
+        hit_bomb = ~wall & (cell == BOMB)
+        ate = ~wall & (cell == FOOD)
+
+        res = np.full(rows.size, MOVED, dtype=np.int8)
+        res[ate] = ATE
+        res[hit_bomb] = HIT_BOMB
+        res[hit_self] = HIT_SELF
+        res[wall] = HIT_WALL
+        outcome[rows] = res
+
+        dead = wall | hit_self | hit_bomb
+        self.alive[rows[dead]] = False
+
+        live = ~dead
+        rows, target, ate = rows[live], target[live], ate[live]
+        if rows.size == 0:
+            return outcome
+
+        cap = self.cells
+        tail_idx = (self.head_idx[rows] + self.length[rows] - 1) % cap
+        self.head_idx[rows] = (self.head_idx[rows] - 1) % cap
+        self.body[rows, self.head_idx[rows]] = target
+        self.grid[rows, target] = SNAKE
+        self.moves[rows] += 1
+
+        movers = rows[~ate]
+        if movers.size:
+            tails = self.body[movers, tail_idx[~ate]]
+            self.grid[movers, tails] = EMPTY
+
+        eaters = rows[ate]
+        if eaters.size:
+            self.length[eaters] += 1
+            self.score[eaters] += 10
+            self._respawn_food(eaters)
+        return outcome
+
+    def _respawn_food(self, rows):
+        free = self.grid[rows] == EMPTY
+        keys = self.rng.random(free.shape)
+        keys[~free] = -1.0
+        picks = keys.argmax(axis=1)
+        ok = keys[np.arange(rows.size), picks] >= 0
+        self.grid[rows[ok], picks[ok]] = FOOD
@@ -0,0 +1,47 @@
+import os
+import statistics
+import subprocess
+import sys
+
+# each mode is timed in a fresh interpreter so nothing is already imported
+MODES = {
+    'main': "import main",
+    'cli': "import terminal",
+    'gui': "import graphicals",
+    'gui_window': "import graphicals; graphicals.pygame.display.init(); graphicals.pygame.font.init()",
+}
+
+PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "{code}\n"
+    "print(time.perf_counter() - start, 'pygame' in sys.modules)\n"
+)
+
+def time_mode(code, runs):
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    env.setdefault('SDL_VIDEODRIVER', 'dummy')
+    samples = []
+    loaded = False
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', PROBE.format(code=code)], cwd=os.path.dirname(os.path.abspath(__file__)),
+                             env=env, capture_output=True, text=True, check=True).stdout.split()
+        samples.append(float(out[0]) * 1000.0)
+        loaded = out[1] == 'True'
+    return samples, loaded
+
+def main(argv):
+    runs = int(argv[1]) if len(argv) > 1 else 10
+    lines = [f"startup import time over {runs} runs (ms)"]
+    for name, code in MODES.items():
+        samples, loaded = time_mode(code, runs)
+        lines.append(f"{name:<11} min {min(samples):7.1f}  median {statistics.median(samples):7.1f}"
+                     f"  pygame loaded: {'yes' if loaded else 'no'}")
+    report = "\n".join(lines)
+    print(report)
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_output.txt'), 'w') as f:
+        f.write(report + "\n")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
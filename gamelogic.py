@@ -1,103 +1,189 @@
 import os
+import pickle
 import random
+import struct
+from array import array
+import numpy as np
 from wcwidth import wcswidth
 
 BOARD_WIDTH = 10
 BOARD_HEIGHT = 8
+MAX_BOARD_SIZE = 10000
+MAX_UNDOS = 3
+DENSE_CELL_LIMIT = 1 << 16
+BITSET_CELL_LIMIT = 1 << 24
+HISTORY_BUDGET = 32 << 20
+CHECKPOINT_INTERVAL = 256
+RECORD_SIZE = 3
+SNAPSHOT_VERSION = 1
+SNAKE_HEADER = struct.Struct('<II')
 
-class Node:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.next = None
-        self.prev = None
+MOVED = 'moved'
+ATE = 'ate'
+HIT_WALL = 'wall'
+HIT_SELF = 'self'
+HIT_BOMB = 'bomb'
+
+UNDONE = 'undone'
+NO_UNDOS_LEFT = 'no_undos_left'
+NOTHING_TO_UNDO = 'nothing_to_undo'
+REDONE = 'redone'
+NOTHING_TO_REDO = 'nothing_to_redo'
+
+def _as_array(typecode, data):
+    if isinstance(data, (bytes, bytearray, memoryview, pickle.PickleBuffer)):
+        result = array(typecode)
+        result.frombytes(memoryview(data).cast('B'))
+        return result
+    return array(typecode, data)
+
+class SnakePositions:
+    def __init__(self, snake):
+        self.snake = snake
+
+    def __contains__(self, pos):
+        return self.snake.contains(pos)
+
+    def __iter__(self):
+        return iter(self.snake)
+
+    def __len__(self):
+        return self.snake.length
 
 class Snake:
-    def __init__(self):
-        self.head = None
-        self.tail = None
-        self.positions = set()
+    def __init__(self, width, height, capacity=16):
+        self.width = width
+        self.height = height
+        area = width * height
+        self.body = array('i' if area < 2 ** 31 else 'q', [0]) * capacity
+        self.start = 0
         self.length = 0
+        if area <= BITSET_CELL_LIMIT:
+            self.bits = bytearray((area + 7) // 8)
+            self.cells = None
+        else:
+            self.bits = None
+            self.cells = set()
+        self.positions = SnakePositions(self)
+
+    def _mark(self, cell):
+        if self.bits is not None:
+            self.bits[cell >> 3] |= 1 << (cell & 7)
+        else:
+            self.cells.add(cell)
+
+    def _unmark(self, cell):
+        if self.bits is not None:
+            self.bits[cell >> 3] &= ~(1 << (cell & 7))
+        else:
+            self.cells.discard(cell)
+
+    def _grow(self):
+        cap = len(self.body)
+        ordered = self.body[self.start:] + self.body[:self.start]
+        self.body = ordered + array(self.body.typecode, [0]) * cap
+        self.start = 0
 
     def add_head(self, x, y):
-        new_node = Node(x, y)
-        new_node.next = self.head
-        if self.head:
-            self.head.prev = new_node
-        self.head = new_node
-        if not self.tail:
-            self.tail = new_node
-        self.positions.add((x, y))
+        if self.length == len(self.body):
+            self._grow()
+        cell = y * self.width + x
+        self.start = (self.start - 1) % len(self.body)
+        self.body[self.start] = cell
+        self._mark(cell)
         self.length += 1
 
     def remove_tail(self):
-        if not self.tail:
+        if not self.length:
             return None
-        if self.head == self.tail:
-            removed = (self.tail.x, self.tail.y)
-            try:
-                self.positions.remove(removed)
-            except KeyError:
-                pass
-            self.head = self.tail = None
-            self.length = 0
-            return removed
-
-        old_tail = self.tail
-        removed = (old_tail.x, old_tail.y)
-        try:
-            self.positions.remove(removed)
-        except KeyError:
-            pass
-        self.tail = old_tail.prev
-        if self.tail:
-            self.tail.next = None
-        old_tail.prev = None
         self.length -= 1
-        return removed
+        cell = self.body[(self.start + self.length) % len(self.body)]
+        self._unmark(cell)
+        return (cell % self.width, cell // self.width)
 
     def remove_head(self):
-        if not self.head:
+        if not self.length:
             return None
-        old_head = self.head
-        removed = (old_head.x, old_head.y)
-        self.head = old_head.next
-        if self.head:
-            self.head.prev = None
-        else:
-            self.tail = None
-        try:
-            self.positions.remove(removed)
-        except KeyError:
-            pass
+        cell = self.body[self.start]
+        self.start = (self.start + 1) % len(self.body)
         self.length -= 1
-        return removed
+        self._unmark(cell)
+        return (cell % self.width, cell // self.width)
 
     def append_tail(self, pos):
+        if self.length == len(self.body):
+            self._grow()
         x, y = pos
-        new_node = Node(x, y)
-        new_node.prev = self.tail
-        if not self.head:
-            self.head = self.tail = new_node
-        else:
-            self.tail.next = new_node
-            self.tail = new_node
-        self.positions.add((x, y))
+        cell = y * self.width + x
+        self.body[(self.start + self.length) % len(self.body)] = cell
+        self._mark(cell)
         self.length += 1
 
+    def __iter__(self):
+        body, width, cap = self.body, self.width, len(self.body)
+        for i in range(self.start, self.start + self.length):
+            cell = body[i % cap]
+            yield (cell % width, cell // width)
+
+    def __len__(self):
+        return self.length
+
     def to_list(self):
-        cur = self.head
-        res = []
-        while cur:
-            res.append((cur.x, cur.y))
-            cur = cur.next
-        return res
+        return list(self)
+
+    def ordered_cells(self):
+        end = self.start + self.length
+        if end <= len(self.body):
+            return self.body[self.start:end]
+        return self.body[self.start:] + self.body[:end - len(self.body)]
+
+    @classmethod
+    def from_cells(cls, width, height, cells):
+        # rebuilds the ring buffer and the bitset in bulk, without a Python
+        # call per segment
+        snake = cls(width, height, capacity=0)
+        body = _as_array(snake.body.typecode, cells)
+        snake.body = body + array(body.typecode, [0]) * max(0, 16 - len(body))
+        snake.length = len(body)
+        if snake.bits is not None:
+            marks = np.zeros(len(snake.bits) * 8, dtype=bool)
+            marks[np.frombuffer(body, dtype=f'i{body.itemsize}')] = True
+            snake.bits = bytearray(np.packbits(marks, bitorder='little'))
+        else:
+            snake.cells = set(body)
+        return snake
+
+    def snapshot(self):
+        return SNAKE_HEADER.pack(self.width, self.height) + self.ordered_cells().tobytes()
+
+    @classmethod
+    def restore(cls, blob):
+        width, height = SNAKE_HEADER.unpack_from(blob)
+        return cls.from_cells(width, height, memoryview(blob)[SNAKE_HEADER.size:])
+
+    def segment(self, i):
+        if i < 0:
+            i += self.length
+        cell = self.body[(self.start + i) % len(self.body)]
+        return (cell % self.width, cell // self.width)
 
     def head_coordinates(self):
-        return (self.head.x, self.head.y)
+        cell = self.body[self.start]
+        return (cell % self.width, cell // self.width)
+
+    def tail_coordinates(self):
+        return self.segment(-1)
 
     def contains(self, pos):
-        return pos in self.positions
+        x, y = pos
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        return self.contains_cell(y * self.width + x)
+
+    def contains_cell(self, cell):
+        if self.bits is not None:
+            return bool(self.bits[cell >> 3] & (1 << (cell & 7)))
+        return cell in self.cells
 
 def _heapify(arr, n, i):
     largest = i
@@ -122,6 +208,218 @@ def heapSort(arr):
     arr.reverse()
     return arr
 
+class FreeCells:
+    def __init__(self, board_w, board_h):
+        self.width = board_w
+        self.height = board_h
+        self.area = board_w * board_h
+        self.occupied = set()
+        self.cells = None
+        self.index = None
+        if self.area <= DENSE_CELL_LIMIT:
+            self._build_index()
+
+    @classmethod
+    def from_cells(cls, board_w, board_h, occupied, cells=None):
+        # cells, when given, is the dense free list in its exact order, which
+        # sample() depends on; otherwise dense boards get it in cell order.
+        # Either way the index is rebuilt in bulk.
+        free = cls.__new__(cls)
+        free.width = board_w
+        free.height = board_h
+        free.area = board_w * board_h
+        free.occupied = occupied
+        free.cells = None
+        free.index = None
+        if cells is None and free.area <= DENSE_CELL_LIMIT:
+            mask = np.ones(free.area, dtype=bool)
+            mask[np.fromiter(occupied, dtype=np.int64, count=len(occupied))] = False
+            cells = np.flatnonzero(mask).astype(np.int32).tobytes()
+        if cells is not None:
+            free.cells = _as_array('i', cells)
+            index = np.full(free.area, -1, dtype=np.int32)
+            index[np.frombuffer(free.cells, dtype=np.int32)] = np.arange(len(free.cells), dtype=np.int32)
+            free.index = _as_array('i', index.tobytes())
+        return free
+
+    def _build_index(self):
+        self.cells = array('i', (c for c in range(self.area) if c not in self.occupied))
+        self.index = array('i', [-1]) * self.area
+        for i, cell in enumerate(self.cells):
+            self.index[cell] = i
+
+    def _crowded(self, extra=0):
+        return (len(self.occupied) + extra) * 4 > self.area * 3
+
+    def __len__(self):
+        return self.area - len(self.occupied)
+
+    def __contains__(self, pos):
+        x, y = pos
+        return 0 <= x < self.width and 0 <= y < self.height and y * self.width + x not in self.occupied
+
+    def occupy(self, pos):
+        x, y = pos
+        cell = y * self.width + x
+        if cell in self.occupied:
+            return
+        self.occupied.add(cell)
+        if self.index is None:
+            return
+        i = self.index[cell]
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[i] = last
+            self.index[last] = i
+        self.index[cell] = -1
+
+    def release(self, pos):
+        x, y = pos
+        cell = y * self.width + x
+        if cell not in self.occupied:
+            return
+        self.occupied.discard(cell)
+        if self.index is None:
+            return
+        self.index[cell] = len(self.cells)
+        self.cells.append(cell)
+
+    def sample(self, rng=random):
+        if len(self) == 0:
+            return None
+        if self.index is None and self._crowded():
+            self._build_index()
+        if self.index is not None:
+            cell = self.cells[rng.randrange(len(self.cells))]
+        else:
+            cell = rng.randrange(self.area)
+            while cell in self.occupied:
+                cell = rng.randrange(self.area)
+        return (cell % self.width, cell // self.width)
+
+    def sample_many(self, k, rng=random):
+        k = min(k, len(self))
+        if self.index is None and self._crowded(k):
+            self._build_index()
+        if self.index is not None:
+            picks = [self.cells[i] for i in rng.sample(range(len(self.cells)), k)]
+        else:
+            picks = []
+            seen = set()
+            while len(picks) < k:
+                cell = rng.randrange(self.area)
+                if cell not in self.occupied and cell not in seen:
+                    seen.add(cell)
+                    picks.append(cell)
+        return [(cell % self.width, cell // self.width) for cell in picks]
+
+class BombSet(set):
+    def __init__(self, positions, board_w, board_h):
+        super().__init__(positions)
+        self.width = board_w
+        self.height = board_h
+        self.adjacent = None
+        self.sparse_counts = {}
+        if board_w * board_h > DENSE_CELL_LIMIT:
+            for pos in self:
+                self._bump(pos, 1)
+            return
+        mask = np.zeros((board_h + 2, board_w + 2), dtype=np.int8)
+        for x, y in self:
+            mask[y + 1, x + 1] = 1
+        self.adjacent = sum(
+            mask[dy:dy + board_h, dx:dx + board_w]
+            for dy in range(3)
+            for dx in range(3)
+        )
+
+    def add(self, pos):
+        if pos not in self:
+            super().add(pos)
+            self._bump(pos, 1)
+
+    def discard(self, pos):
+        if pos in self:
+            super().discard(pos)
+            self._bump(pos, -1)
+
+    def remove(self, pos):
+        if pos not in self:
+            raise KeyError(pos)
+        self.discard(pos)
+
+    # every other mutator goes through add/discard so the counts stay in step
+
+    def pop(self):
+        pos = super().pop()
+        self._bump(pos, -1)
+        return pos
+
+    def clear(self):
+        super().clear()
+        if self.adjacent is not None:
+            self.adjacent[:] = 0
+        self.sparse_counts = {}
+
+    def update(self, *others):
+        for other in others:
+            for pos in other:
+                self.add(pos)
+
+    def difference_update(self, *others):
+        for other in others:
+            for pos in other:
+                self.discard(pos)
+
+    def intersection_update(self, *others):
+        for pos in set(self).difference(set(self).intersection(*others)):
+            self.discard(pos)
+
+    def symmetric_difference_update(self, other):
+        for pos in set(other):
+            if pos in self:
+                self.discard(pos)
+            else:
+                self.add(pos)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+
+    def __iand__(self, other):
+        self.intersection_update(other)
+        return self
+
+    def __ixor__(self, other):
+        self.symmetric_difference_update(other)
+        return self
+
+    def __reduce__(self):
+        return (self.__class__, (list(self), self.width, self.height))
+
+    def _bump(self, pos, delta):
+        x, y = pos
+        if self.adjacent is not None:
+            self.adjacent[max(y - 1, 0):y + 2, max(x - 1, 0):x + 2] += delta
+            return
+        counts = self.sparse_counts
+        for ny in range(max(y - 1, 0), min(y + 2, self.height)):
+            for nx in range(max(x - 1, 0), min(x + 2, self.width)):
+                c = counts.get((nx, ny), 0) + delta
+                if c:
+                    counts[(nx, ny)] = c
+                else:
+                    counts.pop((nx, ny), None)
+
+    def count_at(self, x, y):
+        if self.adjacent is not None:
+            return int(self.adjacent[y, x])
+        return self.sparse_counts.get((x, y), 0)
+
 def list_free_positions(snake_positions, food_set, bombs, board_w, board_h):
     occupied = set(snake_positions) | set(food_set) | set(bombs)
     return [
@@ -131,29 +429,40 @@ def list_free_positions(snake_positions, food_set, bombs, board_w, board_h):
         if (x, y) not in occupied
     ]
 
-def random_free_position(snake_positions, food_set, bombs, board_w, board_h):
+def random_free_position(snake_positions, food_set, bombs, board_w, board_h, rng=random):
     free = list_free_positions(snake_positions, food_set, bombs, board_w, board_h)
     if not free:
         return None
-    return random.choice(free)
+    return rng.choice(free)
 
-def generate_food(snake, bombs, food_count=3):
+def generate_food(snake, bombs, food_count=3, free=None, rng=random):
+    if free is not None:
+        return set(_take_free(free, food_count, rng))
+    # without a free-cell index the board size comes from the snake
     snake_positions = snake.positions if hasattr(snake, 'positions') else set(snake.to_list())
-    free = list_free_positions(snake_positions, set(), bombs, BOARD_WIDTH, BOARD_HEIGHT)
+    free = list_free_positions(snake_positions, set(), bombs, snake.width, snake.height)
     k = min(food_count, len(free))
     if k == 0:
         return set()
-    return set(random.sample(free, k))
+    return set(rng.sample(free, k))
 
-def generate_bombs(snake, food_set, bomb_count=5):
+def generate_bombs(snake, food_set, bomb_count=5, free=None, rng=random):
+    if free is not None:
+        return BombSet(_take_free(free, bomb_count, rng), free.width, free.height)
     snake_positions = snake.positions if hasattr(snake, 'positions') else set(snake.to_list())
-    free = list_free_positions(snake_positions, food_set, set(), BOARD_WIDTH, BOARD_HEIGHT)
+    free = list_free_positions(snake_positions, food_set, set(), snake.width, snake.height)
     k = min(bomb_count, len(free))
-    if k == 0:
-        return set()
-    return set(random.sample(free, k))
+    return BombSet(rng.sample(free, k), snake.width, snake.height)
+
+def _take_free(free, count, rng=random):
+    picks = free.sample_many(count, rng)
+    for pos in picks:
+        free.occupy(pos)
+    return picks
 
 def count_adjacent_bombs(x, y, bombs):
+    if isinstance(bombs, BombSet) and 0 <= x < bombs.width and 0 <= y < bombs.height:
+        return bombs.count_at(x, y)
     count = 0
     for dx in [-1, 0, 1]:
         for dy in [-1, 0, 1]:
@@ -161,10 +470,333 @@ def count_adjacent_bombs(x, y, bombs):
                 count += 1
     return count
 
+class NullDirty:
+    def add(self, pos):
+        pass
+
+    def update(self, cells):
+        pass
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+NO_DIRTY = NullDirty()
+
+class GameState:
+    def __init__(self, food_count=3, bomb_count=5, trial=False, max_undos=MAX_UNDOS, width=BOARD_WIDTH, height=BOARD_HEIGHT,
+                 seed=None, history_budget=HISTORY_BUDGET, track_dirty=False):
+        # every game draws from its own generator; an unseeded game still
+        # records the seed it picked so it can be replayed
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.width = width
+        self.height = height
+        self.food_count = food_count
+        self.bomb_count = bomb_count
+        self.trial = trial
+        self.max_undos = max_undos
+        self.history_budget = history_budget
+        self.track_dirty = track_dirty
+        self.recorder = None
+        self.reset()
+
+    def reset(self):
+        if self.recorder is not None:
+            self.recorder.record_reset()
+        self.rng = random.Random(self.seed)
+        self.snake = Snake(self.width, self.height)
+        self.free = FreeCells(self.width, self.height)
+        start = (self.width // 2, self.height // 2)
+        self.snake.add_head(*start)
+        self.free.occupy(start)
+        self.score = 0
+        temp_empty_bombs = set()
+        self.food_set = generate_food(self.snake, temp_empty_bombs, self.food_count, self.free, self.rng)
+        self.bombs = generate_bombs(self.snake, self.food_set, self.bomb_count, self.free, self.rng)
+        # one (head, removed tail, respawned food) record per move, -1 for
+        # none; records past history_pos are the moves available to redo
+        self.history = array('q')
+        self.history_pos = 0
+        self.history_base = 0
+        self.checkpoints = []
+        self.checkpoint_bytes = 0
+        self.remaining_undos = self.max_undos
+        self.over = False
+        self.outcome = None
+        # changed cells are only collected for a front end that asked for them
+        self.dirty = set() if self.track_dirty else NO_DIRTY
+
+    def take_dirty(self):
+        dirty = self.dirty
+        self.dirty = set() if self.track_dirty else NO_DIRTY
+        return dirty
+
+    @property
+    def move_count(self):
+        return self.history_base + self.history_pos
+
+    def step(self, direction):
+        if self.over:
+            return self.outcome
+        if self.recorder is not None:
+            self.recorder.record_step(direction)
+        dx, dy = direction
+        head_x, head_y = self.snake.head_coordinates()
+        new_x, new_y = head_x + dx, head_y + dy
+
+        if new_x < 0 or new_x >= self.width or new_y < 0 or new_y >= self.height:
+            return self._end(HIT_WALL)
+        if (new_x, new_y) in self.snake.positions:
+            return self._end(HIT_SELF)
+        if (new_x, new_y) in self.bombs:
+            return self._end(HIT_BOMB)
+
+        del self.history[self.history_pos * RECORD_SIZE:]
+        while self.checkpoints and self.checkpoints[-1][0] > self.move_count:
+            self.checkpoint_bytes -= _checkpoint_size(self.checkpoints.pop())
+        tail, respawn = self._advance(new_x, new_y)
+        self.history.extend((new_y * self.width + new_x, tail, respawn))
+        self.history_pos += 1
+        if self.move_count % CHECKPOINT_INTERVAL == 0:
+            self.checkpoints.append(self._checkpoint())
+            self.checkpoint_bytes += _checkpoint_size(self.checkpoints[-1])
+        if len(self.history) * self.history.itemsize + self.checkpoint_bytes > self.history_budget:
+            self._trim_history()
+        self.outcome = MOVED if tail >= 0 else ATE
+        return self.outcome
+
+    def _advance(self, new_x, new_y, respawn=None):
+        # shared by step and redo; redo passes the food cell recorded the
+        # first time instead of sampling a new one
+        head_x, head_y = self.snake.head_coordinates()
+        self.snake.add_head(new_x, new_y)
+        self.free.occupy((new_x, new_y))
+        self.dirty.add((head_x, head_y))
+        self.dirty.add((new_x, new_y))
+
+        if (new_x, new_y) in self.food_set:
+            self.food_set.discard((new_x, new_y))
+            if not self.trial:
+                self.score += 10
+            if respawn is None:
+                pos = self.free.sample(self.rng)
+            elif respawn >= 0:
+                pos = (respawn % self.width, respawn // self.width)
+            else:
+                pos = None
+            if pos is not None:
+                self.food_set.add(pos)
+                self.free.occupy(pos)
+                self.dirty.add(pos)
+                return -1, pos[1] * self.width + pos[0]
+            return -1, -1
+        removed_tail = self.snake.remove_tail()
+        self.free.release(removed_tail)
+        self.dirty.add(removed_tail)
+        self.dirty.add(self.snake.tail_coordinates())
+        return removed_tail[1] * self.width + removed_tail[0], -1
+
+    def _end(self, outcome):
+        self.over = True
+        self.outcome = outcome
+        return outcome
+
+    def undo(self):
+        if self.recorder is not None:
+            self.recorder.record_undo()
+        if self.remaining_undos is not None and self.remaining_undos <= 0:
+            return NO_UNDOS_LEFT
+        if not self.history_pos:
+            return NOTHING_TO_UNDO
+        self._retreat()
+        if self.remaining_undos is not None:
+            self.remaining_undos -= 1
+        return UNDONE
+
+    def redo(self):
+        if self.recorder is not None:
+            self.recorder.record_redo()
+        if self.history_pos * RECORD_SIZE >= len(self.history):
+            return NOTHING_TO_REDO
+        self._forward()
+        return REDONE
+
+    def _retreat(self):
+        self.history_pos -= 1
+        i = self.history_pos * RECORD_SIZE
+        head, tail, respawn = self.history[i:i + RECORD_SIZE]
+        removed_head = self.snake.remove_head()
+        self.free.release(removed_head)
+        self.dirty.add(removed_head)
+        if self.snake.length:
+            self.dirty.add(self.snake.head_coordinates())
+        if tail < 0:
+            if not self.trial:
+                self.score -= 10
+            if respawn >= 0:
+                respawned = (respawn % self.width, respawn // self.width)
+                self.food_set.discard(respawned)
+                self.free.release(respawned)
+                self.dirty.add(respawned)
+            self.food_set.add(removed_head)
+            self.free.occupy(removed_head)
+        else:
+            removed_tail = (tail % self.width, tail // self.width)
+            if self.snake.length:
+                self.dirty.add(self.snake.tail_coordinates())
+            self.snake.append_tail(removed_tail)
+            self.free.occupy(removed_tail)
+            self.dirty.add(removed_tail)
+
+    def _forward(self):
+        i = self.history_pos * RECORD_SIZE
+        head, tail, respawn = self.history[i:i + RECORD_SIZE]
+        self._advance(head % self.width, head // self.width, respawn)
+        self.history_pos += 1
+
+    def snapshot(self, buffer_callback=None, history_window=None):
+        # large arrays travel as pickle protocol 5 buffers, so a caller that
+        # passes buffer_callback gets them out-of-band without a copy;
+        # history_window keeps at most that many moves on either side of the
+        # current one, none the remaining undos cannot reach, and no checkpoints
+        kept = self.history_pos
+        last = len(self.history)
+        checkpoints = self.checkpoints
+        if history_window is not None:
+            kept = min(kept, history_window)
+            if self.remaining_undos is not None:
+                kept = min(kept, self.remaining_undos)
+            last = min(last, (self.history_pos + history_window) * RECORD_SIZE)
+            checkpoints = []
+        first = (self.history_pos - kept) * RECORD_SIZE
+        rng_version, rng_key, rng_gauss = self.rng.getstate()
+        free_cells = self.free.cells[:] if self.free.index is not None else None
+        meta = (
+            SNAPSHOT_VERSION, self.width, self.height, self.food_count, self.bomb_count, self.trial,
+            self.max_undos, self.history_budget, self.seed, self.score, self.remaining_undos,
+            kept, self.move_count - kept, self.over, self.outcome, rng_version, rng_gauss,
+        )
+        arrays = (
+            self.snake.ordered_cells(),
+            array('q', (y * self.width + x for x, y in self.food_set)),
+            array('q', (y * self.width + x for x, y in self.bombs)),
+            free_cells,
+            self.history[first:last],
+            array('I', rng_key),
+        )
+        buffers = tuple(None if a is None else pickle.PickleBuffer(a) for a in arrays)
+        return pickle.dumps((meta, buffers, checkpoints), protocol=5, buffer_callback=buffer_callback)
+
+    @classmethod
+    def restore(cls, blob, buffers=None):
+        meta, arrays, checkpoints = pickle.loads(blob, buffers=buffers)
+        (version, width, height, food_count, bomb_count, trial, max_undos, history_budget, seed, score,
+         remaining_undos, history_pos, history_base, over, outcome, rng_version, rng_gauss) = meta
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {version}")
+        body, food, bombs, free_cells, history, rng_key = arrays
+        state = cls.__new__(cls)
+        state.seed = seed
+        state.width = width
+        state.height = height
+        state.food_count = food_count
+        state.bomb_count = bomb_count
+        state.trial = trial
+        state.max_undos = max_undos
+        state.history_budget = history_budget
+        state.recorder = None
+        state.rng = random.Random()
+        state.rng.setstate((rng_version, tuple(_as_array('I', rng_key)), rng_gauss))
+        state.snake = Snake.from_cells(width, height, body)
+        food = _as_array('q', food)
+        bombs = _as_array('q', bombs)
+        state.food_set = {(cell % width, cell // width) for cell in food}
+        state.bombs = BombSet(((cell % width, cell // width) for cell in bombs), width, height)
+        occupied = set(state.snake.body[:state.snake.length])
+        occupied.update(food)
+        occupied.update(bombs)
+        state.free = FreeCells.from_cells(width, height, occupied, free_cells)
+        state.score = score
+        state.history = _as_array('q', history)
+        state.history_pos = history_pos
+        state.history_base = history_base
+        state.checkpoints = checkpoints
+        state.checkpoint_bytes = sum(_checkpoint_size(c) for c in checkpoints)
+        state.remaining_undos = remaining_undos
+        state.over = over
+        state.outcome = outcome
+        state.track_dirty = False
+        state.dirty = NO_DIRTY
+        return state
+
+    def _checkpoint(self):
+        food = array('q', sorted(y * self.width + x for x, y in self.food_set))
+        return (self.move_count, self.snake.ordered_cells(), food, self.score)
+
+    def _trim_history(self):
+        # checkpoints may use half the budget and are thinned to every other
+        # one past that, which only makes travel() replay further. Records
+        # over the rest are cut to half of it at once so trimming stays
+        # amortized O(1) per move; those moves can no longer be undone.
+        half = self.history_budget // 2
+        while self.checkpoint_bytes > half:
+            self.checkpoints = self.checkpoints[-1::-2][::-1] if len(self.checkpoints) > 1 else []
+            self.checkpoint_bytes = sum(_checkpoint_size(c) for c in self.checkpoints)
+        room = self.history_budget - self.checkpoint_bytes
+        if len(self.history) * self.history.itemsize > room:
+            keep = room // (2 * self.history.itemsize * RECORD_SIZE)
+            drop = max(1, self.history_pos - keep)
+            del self.history[:drop * RECORD_SIZE]
+            self.history_pos -= drop
+            self.history_base += drop
+            self.checkpoints = [c for c in self.checkpoints if c[0] >= self.history_base]
+            self.checkpoint_bytes = sum(_checkpoint_size(c) for c in self.checkpoints)
+
+    def travel(self, move):
+        # jump to any move still in the history without touching the undo
+        # allowance, starting from the closest checkpoint when that is nearer
+        end = self.history_base + len(self.history) // RECORD_SIZE
+        move = max(self.history_base, min(move, end))
+        best = None
+        for checkpoint in self.checkpoints:
+            if best is None or abs(checkpoint[0] - move) < abs(best[0] - move):
+                best = checkpoint
+        if best is not None and abs(best[0] - move) < abs(self.move_count - move):
+            self._restore_checkpoint(best)
+        while self.move_count > move:
+            self._retreat()
+        while self.move_count < move:
+            self._forward()
+        self.over = False
+        self.outcome = None
+        return self.move_count
+
+    def _restore_checkpoint(self, checkpoint):
+        move, body, food, score = checkpoint
+        self.dirty.update(self.snake)
+        self.dirty.update(self.food_set)
+        self.snake = Snake.from_cells(self.width, self.height, body)
+        self.food_set = {(cell % self.width, cell // self.width) for cell in food}
+        occupied = set(body)
+        occupied.update(food)
+        occupied.update(y * self.width + x for x, y in self.bombs)
+        self.free = FreeCells.from_cells(self.width, self.height, occupied)
+        self.score = score
+        self.history_pos = move - self.history_base
+        self.dirty.update(self.snake)
+        self.dirty.update(self.food_set)
+
+def _checkpoint_size(checkpoint):
+    _, body, food, _ = checkpoint
+    return len(body) * body.itemsize + len(food) * food.itemsize
+
 def print_board(board, snake, food_set, bombs, trial=False):
     display = [row.copy() for row in board]
-    snake_list = snake.to_list()
-    snake_set = snake.positions if hasattr(snake, 'positions') else set(snake_list)
+    board_h = len(board)
+    board_w = len(board[0])
+    snake_set = snake.positions
 
     for fx, fy in food_set:
         display[fy][fx] = '🍎'
@@ -174,21 +806,21 @@ def print_board(board, snake, food_set, bombs, trial=False):
             display[by][bx] = '💣'
 
     head_coords = snake.head_coordinates()
-    for x, y in snake_list:
+    for x, y in snake:
         display[y][x] = '🐍' if (x, y) == head_coords else '🟩'
 
     head_x, head_y = head_coords
     for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
         nx, ny = head_x + dx, head_y + dy
-        if 0 <= nx < BOARD_WIDTH and 0 <= ny < BOARD_HEIGHT:
+        if 0 <= nx < board_w and 0 <= ny < board_h:
             pos = (nx, ny)
             if pos not in food_set and pos not in snake_set:
                 display[ny][nx] = str(count_adjacent_bombs(nx, ny, bombs))
 
     cell_w = 6
-    horiz_top = "╔" + "╦".join(["═" * cell_w for _ in range(BOARD_WIDTH)]) + "╗"
-    horiz_mid = "╠" + "╬".join(["═" * cell_w for _ in range(BOARD_WIDTH)]) + "╣"
-    horiz_bot = "╚" + "╩".join(["═" * cell_w for _ in range(BOARD_WIDTH)]) + "╝"
+    horiz_top = "╔" + "╦".join(["═" * cell_w for _ in range(board_w)]) + "╗"
+    horiz_mid = "╠" + "╬".join(["═" * cell_w for _ in range(board_w)]) + "╣"
+    horiz_bot = "╚" + "╩".join(["═" * cell_w for _ in range(board_w)]) + "╝"
 
     print(horiz_top)
     for y, row in enumerate(display):
@@ -1,21 +1,30 @@
 import os
+import random
 os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
 import pygame
-import random
-from gamelogic import Snake, generate_food, generate_bombs, count_adjacent_bombs, heapSort, BOARD_WIDTH, BOARD_HEIGHT, random_free_position
-
-pygame.init()
-pygame.mixer.init()
+from collections import OrderedDict
+from gamelogic import GameState, count_adjacent_bombs, BOARD_WIDTH, BOARD_HEIGHT, MAX_UNDOS, HIT_WALL, HIT_SELF, HIT_BOMB, NO_UNDOS_LEFT, NOTHING_TO_UNDO, NOTHING_TO_REDO
+from autopilot import Autopilot
+from inference import BombInference
+from leaderboard import open_store, print_parse_errors
+from profiler import FrameProfiler
+from replay import ReplayRecorder, new_replay_path
 
 CELL_SIZE = 70
 SIDEBAR_WIDTH = 380
 HEADER_HEIGHT = 140
 PADDING = 20
 
-GAME_AREA_WIDTH = BOARD_WIDTH * CELL_SIZE
-GAME_AREA_HEIGHT = BOARD_HEIGHT * CELL_SIZE
-WINDOW_WIDTH = GAME_AREA_WIDTH + SIDEBAR_WIDTH + PADDING * 3
-WINDOW_HEIGHT = GAME_AREA_HEIGHT + HEADER_HEIGHT + PADDING * 2
+MAX_VIEW_COLS = 12
+MAX_VIEW_ROWS = 9
+
+# frame scheduling: full rate only right after input during play, otherwise
+# the loop sleeps until the next animation step or leaderboard sync is due
+FRAME_RATE = 60
+ACTIVE_WINDOW = 1000
+SPARK_INTERVAL = 100
+CURSOR_BLINK = 500
+HEAT_LEVELS = 10
 
 COLORS = {
     'bg': (76, 111, 68),
@@ -44,6 +53,17 @@ COLORS = {
     'button_hover': (110, 150, 100),
 }
 
+SIDEBAR_CONTROLS = [
+    ("WASD / Arrows", "Move"),
+    ("Z / Y", "Undo / redo move"),
+    ("P / H", "Autopilot / danger map"),
+    ("R", "Restart game"),
+    ("L", "Leaderboard"),
+    ("Q / ESC", "Quit"),
+]
+
+LINK_DIRECTIONS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
 DIRECTIONS = {
     pygame.K_w: (0, -1),
     pygame.K_UP: (0, -1),
@@ -55,9 +75,42 @@ DIRECTIONS = {
     pygame.K_RIGHT: (1, 0),
 }
 
+class TextCache:
+    def __init__(self, capacity=512):
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+
+    def render(self, font, text, antialias, color):
+        key = (font, text, antialias, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
 class GameGUI:
-    def __init__(self, food_count=3, bomb_count=7, trial=False):
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    def __init__(self, food_count=3, bomb_count=7, trial=False, width=BOARD_WIDTH, height=BOARD_HEIGHT, leaderboard_file=None, profile_file=None, seed=None, replay_dir=None, max_undos=MAX_UNDOS):
+        # only the subsystems the GUI uses; the game has no sound
+        pygame.display.init()
+        pygame.font.init()
+        # each new game takes its seed from this stream, so one session seed
+        # reproduces every round played
+        self.seed = seed
+        self.seeds = random.Random(seed)
+        self.replay_dir = replay_dir
+        self.recorder = None
+        self.autopilot = None
+        self.show_heatmap = False
+        self.board_width = width
+        self.board_height = height
+        self.setup_window()
         pygame.display.set_caption("SnakeSweeper")
         try:
             icon = pygame.Surface((32, 32))
@@ -70,18 +123,18 @@ class GameGUI:
         self.font_medium = pygame.font.Font(None, 36)
         self.font_small = pygame.font.Font(None, 28)
         self.font_tiny = pygame.font.Font(None, 22)
+        self.text_cache = TextCache()
         self.food_count = food_count
         self.bomb_count = bomb_count
         self.trial = trial
-        self.undo_stack = []
-        self.MAX_UNDOS = 3
-        self.remaining_undos = self.MAX_UNDOS
+        self.MAX_UNDOS = max_undos
         self.pulse_offset = 0
         self.grid_offset = 0
         self.game_over = False
         self.game_over_message = ""
         self.victory = False
-        self.leaderboard_file = os.path.join(os.path.dirname(__file__), "leaderboard.txt")
+        self.leaderboard_file = leaderboard_file or os.path.join(os.path.dirname(__file__), "leaderboard.txt")
+        self.store = open_store(self.leaderboard_file)
         self.leaderboard = self.load_leaderboard()
         print(f"Loaded {len(self.leaderboard)} scores from {self.leaderboard_file}")
         self.player_name = None
@@ -96,22 +149,96 @@ class GameGUI:
         self.reset_game()
         self.last_move_time = 0
         self.move_cooldown = 100
+        self.last_sync_time = 0
+        self.sync_interval = 1000
+        self.last_input_time = -ACTIVE_WINDOW
+        self.profile_file = profile_file
+        self.profiler = FrameProfiler(enabled=profile_file is not None)
+        self.show_profile = False
 
     def reset_game(self):
-        self.snake = Snake()
-        self.snake.add_head(BOARD_WIDTH // 2, BOARD_HEIGHT // 2)
-        self.score = 0
-        temp_empty_bombs = set()
-        self.food_set = generate_food(self.snake, temp_empty_bombs, self.food_count)
-        self.bombs = generate_bombs(self.snake, self.food_set, self.bomb_count)
+        if self.recorder is not None:
+            self.recorder.close()
+        self.state = GameState(self.food_count, self.bomb_count, trial=self.trial, max_undos=self.MAX_UNDOS,
+                               width=self.board_width, height=self.board_height, seed=self.seeds.getrandbits(64),
+                               track_dirty=True)
+        if self.replay_dir:
+            self.recorder = ReplayRecorder(new_replay_path(self.replay_dir, self.state), self.state)
+        self.inference = BombInference.for_state(self.state)
+        if self.autopilot is not None:
+            self.autopilot = Autopilot(self.state, inference=self.inference)
         self.game_over = False
         self.game_over_message = ""
         self.victory = False
-        self.undo_stack = []
-        self.remaining_undos = self.MAX_UNDOS
         self.show_name_input = False
         self.name_input_text = ""
         self.last_move_time = 0
+        self.full_redraw = True
+
+    @property
+    def snake(self):
+        return self.state.snake
+
+    @property
+    def food_set(self):
+        return self.state.food_set
+
+    @property
+    def bombs(self):
+        return self.state.bombs
+
+    @property
+    def score(self):
+        return self.state.score
+
+    @property
+    def remaining_undos(self):
+        return self.state.remaining_undos
+
+    def setup_window(self):
+        self.view_cols = min(self.board_width, MAX_VIEW_COLS)
+        self.view_rows = min(self.board_height, MAX_VIEW_ROWS)
+        self.game_area_width = self.view_cols * CELL_SIZE
+        self.game_area_height = self.view_rows * CELL_SIZE
+        self.window_width = self.game_area_width + SIDEBAR_WIDTH + PADDING * 3
+        self.window_height = self.game_area_height + HEADER_HEIGHT + PADDING * 2
+        self.screen = pygame.display.set_mode((self.window_width, self.window_height))
+        self.invalidate_layers()
+
+    def set_theme(self, colors):
+        COLORS.update(colors)
+        self.invalidate_layers()
+
+    def invalidate_layers(self):
+        self.layers = {}
+        self.full_redraw = True
+
+    def layer(self, key, build):
+        surface = self.layers.get(key)
+        if surface is None:
+            surface = build()
+            self.layers[key] = surface
+        return surface
+
+    def build_overlay(self, alpha):
+        overlay = pygame.Surface((self.window_width, self.window_height))
+        overlay.set_alpha(alpha)
+        overlay.fill(COLORS['bg'])
+        return overlay
+
+    def build_panel(self, width, height, radius, border):
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        box_rect = pygame.Rect(0, 0, width, height)
+        self.draw_rounded_rect(panel, COLORS['header'], box_rect, radius)
+        pygame.draw.rect(panel, COLORS['accent'], box_rect, border, border_radius=radius)
+        return panel
+
+    def render_text(self, font, text, color, antialias=True):
+        return self.text_cache.render(font, text, antialias, color)
+
+    def blit_centered(self, surface, text, font, color, center):
+        rendered = self.render_text(font, text, color)
+        surface.blit(rendered, rendered.get_rect(center=center))
 
     def draw_rounded_rect(self, surface, color, rect, radius=10):
         pygame.draw.rect(surface, color, rect, border_radius=radius)
@@ -127,75 +254,72 @@ class GameGUI:
                            (rect.x + rect.width, rect.y + i))
 
     def load_leaderboard(self):
-        leaderboard = []
-        try:
-            with open(self.leaderboard_file, 'r') as file:
-                for line in file:
-                    line = line.strip()
-                    if not line or ':' not in line:
-                        continue
-                    name_part, score_part = line.split(':', 1)
-                    try:
-                        leaderboard.append([name_part.strip(), int(score_part.strip())])
-                    except ValueError:
-                        continue
-        except FileNotFoundError:
-            leaderboard = []
-        return leaderboard
+        board = self.store.load()
+        print_parse_errors(board, self.leaderboard_file)
+        return board
 
     def save_score(self, name, score):
-        with open(self.leaderboard_file, 'a') as file:
-            file.write(f"{name}:{score}\n")
-        self.leaderboard.append([name, score])
-        self.leaderboard = heapSort(self.leaderboard)
+        self.store.add(name, score)
+        self.store.flush()
+        self.store.sync(self.leaderboard)
 
     def get_top_leaderboard(self, count=5):
-        sorted_board = heapSort(self.leaderboard.copy())
-        return sorted_board[:count]
+        return self.leaderboard.top(count)
 
-    def draw_header(self):
-        header_rect = pygame.Rect(PADDING, PADDING, WINDOW_WIDTH - PADDING * 2, HEADER_HEIGHT)
+    def build_header_layer(self):
+        area = self.header_area()
+        layer = pygame.Surface(area.size)
+        layer.fill(COLORS['bg'])
+        header_rect = pygame.Rect(0, 0, area.width, HEADER_HEIGHT)
         shadow_rect = header_rect.copy()
         shadow_rect.y += 4
-        self.draw_rounded_rect(self.screen, COLORS['shadow'], shadow_rect, 20)
-        self.draw_rounded_rect(self.screen, COLORS['header'], header_rect, 20)
-        title_shadow = self.font_large.render("SNAKESWEEPER", True, COLORS['shadow'])
-        title = self.font_large.render("SNAKESWEEPER", True, COLORS['accent'])
-        title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, PADDING + 35))
+        self.draw_rounded_rect(layer, COLORS['shadow'], shadow_rect, 20)
+        self.draw_rounded_rect(layer, COLORS['header'], header_rect, 20)
+        title_shadow = self.render_text(self.font_large, "SNAKESWEEPER", COLORS['shadow'])
+        title = self.render_text(self.font_large, "SNAKESWEEPER", COLORS['accent'])
+        title_rect = title.get_rect(center=(self.window_width // 2 - area.x, PADDING + 35 - area.y))
         shadow_rect = title_rect.copy()
         shadow_rect.y += 3
-        self.screen.blit(title_shadow, shadow_rect)
-        self.screen.blit(title, title_rect)
+        layer.blit(title_shadow, shadow_rect)
+        layer.blit(title, title_rect)
+        return layer
+
+    def draw_header(self):
+        self.screen.blit(self.layer('header', self.build_header_layer), self.header_area())
         score_bg = pygame.Rect(PADDING + 15, PADDING + 75, 160, 35)
         self.draw_rounded_rect(self.screen, COLORS['button'], score_bg, 10)
-        score_text = self.font_small.render(f"SCORE: {self.score}", True, COLORS['text'])
+        score_text = self.render_text(self.font_small, f"SCORE: {self.score}", COLORS['text'])
         score_rect = score_text.get_rect(center=score_bg.center)
         self.screen.blit(score_text, score_rect)
-        undo_bg = pygame.Rect(WINDOW_WIDTH // 2 - 80, PADDING + 75, 160, 35)
-        undo_color_bg = COLORS['button'] if self.remaining_undos > 0 else COLORS['shadow']
+        undo_bg = pygame.Rect(self.window_width // 2 - 80, PADDING + 75, 160, 35)
+        if self.remaining_undos is None:
+            undo_color_bg = COLORS['button']
+            undo_label = "UNDO: FREE"
+        else:
+            undo_color_bg = COLORS['button'] if self.remaining_undos > 0 else COLORS['shadow']
+            undo_label = f"UNDO: {self.remaining_undos}/{self.MAX_UNDOS}"
         self.draw_rounded_rect(self.screen, undo_color_bg, undo_bg, 10)
-        undo_text = self.font_small.render(f"UNDO: {self.remaining_undos}/{self.MAX_UNDOS}", True, COLORS['text'])
+        undo_text = self.render_text(self.font_small, undo_label, COLORS['text'])
         undo_rect = undo_text.get_rect(center=undo_bg.center)
         self.screen.blit(undo_text, undo_rect)
         if self.trial:
-            trial_bg = pygame.Rect(WINDOW_WIDTH - PADDING - 175, PADDING + 75, 160, 35)
+            trial_bg = pygame.Rect(self.window_width - PADDING - 175, PADDING + 75, 160, 35)
             self.draw_rounded_rect(self.screen, COLORS['danger'], trial_bg, 10)
-            trial_text = self.font_small.render("PRACTICE", True, COLORS['text'])
+            trial_text = self.render_text(self.font_small, "PRACTICE", COLORS['text'])
             trial_rect = trial_text.get_rect(center=trial_bg.center)
             self.screen.blit(trial_text, trial_rect)
 
-    def draw_board(self):
-        board_x = PADDING
-        board_y = HEADER_HEIGHT + PADDING * 2
-        shadow_rect = pygame.Rect(board_x, board_y + 4, GAME_AREA_WIDTH, GAME_AREA_HEIGHT)
-        self.draw_rounded_rect(self.screen, COLORS['shadow'], shadow_rect, 20)
-        board_rect = pygame.Rect(board_x, board_y, GAME_AREA_WIDTH, GAME_AREA_HEIGHT)
-        board_surface = pygame.Surface((GAME_AREA_WIDTH, GAME_AREA_HEIGHT), pygame.SRCALPHA)
-        temp_rect = pygame.Rect(0, 0, GAME_AREA_WIDTH, GAME_AREA_HEIGHT)
+    def build_board_layer(self, parity):
+        layer = pygame.Surface((self.game_area_width, self.game_area_height + 4))
+        layer.fill(COLORS['bg'])
+        shadow_rect = pygame.Rect(0, 4, self.game_area_width, self.game_area_height)
+        self.draw_rounded_rect(layer, COLORS['shadow'], shadow_rect, 20)
+        board_surface = pygame.Surface((self.game_area_width, self.game_area_height), pygame.SRCALPHA)
+        temp_rect = pygame.Rect(0, 0, self.game_area_width, self.game_area_height)
         pygame.draw.rect(board_surface, COLORS['board_bg_light'], temp_rect, border_radius=20)
-        for y in range(BOARD_HEIGHT):
-            for x in range(BOARD_WIDTH):
-                if (x + y) % 2 == 1:
+        for y in range(self.view_rows):
+            for x in range(self.view_cols):
+                if (x + y + parity) % 2 == 1:
                     cell_rect = pygame.Rect(
                         x * CELL_SIZE,
                         y * CELL_SIZE,
@@ -203,133 +327,150 @@ class GameGUI:
                         CELL_SIZE
                     )
                     pygame.draw.rect(board_surface, COLORS['board_bg_dark'], cell_rect)
-        self.screen.blit(board_surface, (board_x, board_y))
+        layer.blit(board_surface, (0, 0))
+        return layer
+
+    def board_layer(self):
+        parity = sum(self.view) % 2
+        return self.layer(('board', parity), lambda: self.build_board_layer(parity))
+
+    def draw_board(self):
+        board_x = PADDING
+        board_y = HEADER_HEIGHT + PADDING * 2
+        self.view = self.view_origin()
+        view_x, view_y = self.view
+        self.screen.blit(self.board_layer(), (board_x, board_y))
+        self.screen.set_clip(pygame.Rect(board_x, board_y, self.game_area_width, self.game_area_height))
+        offset_x = board_x - view_x * CELL_SIZE
+        offset_y = board_y - view_y * CELL_SIZE
+        if self.show_heatmap:
+            for y in range(view_y, view_y + self.view_rows):
+                for x in range(view_x, view_x + self.view_cols):
+                    self.draw_heat(x, y, offset_x, offset_y)
         if self.trial:
             for bx, by in self.bombs:
-                self.draw_bomb(bx, by, board_x, board_y)
+                if self.in_view(bx, by):
+                    self.draw_bomb(bx, by, offset_x, offset_y)
         for fx, fy in self.food_set:
-            self.draw_food(fx, fy, board_x, board_y)
-        snake_list = self.snake.to_list()
+            if self.in_view(fx, fy):
+                self.draw_food(fx, fy, offset_x, offset_y)
         head_coords = self.snake.head_coordinates()
-        for i in range(len(snake_list) - 1):
-            self.draw_snake_connection(snake_list[i], snake_list[i + 1], board_x, board_y)
-        for idx, (sx, sy) in enumerate(snake_list):
-            is_head = (sx, sy) == head_coords
-            next_seg = snake_list[idx + 1] if idx + 1 < len(snake_list) else None
-            prev_seg = snake_list[idx - 1] if idx > 0 else None
-            self.draw_snake_segment(sx, sy, board_x, board_y, is_head, prev_seg, next_seg)
+        segments = iter(self.snake)
+        prev_seg = None
+        seg = next(segments, None)
+        while seg is not None:
+            next_seg = next(segments, None)
+            if self.in_view(*seg):
+                self.draw_snake_segment(seg[0], seg[1], offset_x, offset_y, seg == head_coords, prev_seg, next_seg)
+            prev_seg, seg = seg, next_seg
         head_x, head_y = head_coords
         for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
             nx, ny = head_x + dx, head_y + dy
-            if 0 <= nx < BOARD_WIDTH and 0 <= ny < BOARD_HEIGHT:
+            if 0 <= nx < self.board_width and 0 <= ny < self.board_height:
                 pos = (nx, ny)
                 if pos not in self.food_set and pos not in self.snake.positions:
                     count = count_adjacent_bombs(nx, ny, self.bombs)
-                    self.draw_bomb_count(nx, ny, count, board_x, board_y)
-
-    def draw_snake_connection(self, seg1, seg2, offset_x, offset_y):
-        x1, y1 = seg1
-        x2, y2 = seg2
-        
-        cell_x1 = offset_x + x1 * CELL_SIZE + CELL_SIZE // 2
-        cell_y1 = offset_y + y1 * CELL_SIZE + CELL_SIZE // 2
-        cell_x2 = offset_x + x2 * CELL_SIZE + CELL_SIZE // 2
-        cell_y2 = offset_y + y2 * CELL_SIZE + CELL_SIZE // 2
-        
+                    self.draw_bomb_count(nx, ny, count, offset_x, offset_y)
+        self.screen.set_clip(None)
+
+    def view_origin(self):
+        head_x, head_y = self.snake.head_coordinates()
+        view_x = max(0, min(head_x - self.view_cols // 2, self.board_width - self.view_cols))
+        view_y = max(0, min(head_y - self.view_rows // 2, self.board_height - self.view_rows))
+        return view_x, view_y
+
+    def in_view(self, x, y):
+        view_x, view_y = self.view
+        return view_x <= x < view_x + self.view_cols and view_y <= y < view_y + self.view_rows
+
+    def paint_snake_connection(self, surface, center1, center2):
+        cell_x1, cell_y1 = center1
+        cell_x2, cell_y2 = center2
+        x1, x2 = cell_x1, cell_x2
+
         width = 48
-        if x1 == x2:  
+        if x1 == x2:
             top_y = min(cell_y1, cell_y2)
             bottom_y = max(cell_y1, cell_y2)
             rect = pygame.Rect(cell_x1 - width // 2 + 2, top_y + 2, width, bottom_y - top_y)
-            pygame.draw.rect(self.screen, COLORS['shadow'], rect)
-        else:  
+            pygame.draw.rect(surface, COLORS['shadow'], rect)
+        else:
             left_x = min(cell_x1, cell_x2)
             right_x = max(cell_x1, cell_x2)
             rect = pygame.Rect(left_x + 2, cell_y1 - width // 2 + 2, right_x - left_x, width)
-            pygame.draw.rect(self.screen, COLORS['shadow'], rect)
-        
-        if x1 == x2: 
+            pygame.draw.rect(surface, COLORS['shadow'], rect)
+
+        if x1 == x2:
             top_y = min(cell_y1, cell_y2)
             bottom_y = max(cell_y1, cell_y2)
             rect = pygame.Rect(cell_x1 - width // 2, top_y, width, bottom_y - top_y)
-            pygame.draw.rect(self.screen, COLORS['snake_body'], rect)
+            pygame.draw.rect(surface, COLORS['snake_body'], rect)
             left_x = min(cell_x1, cell_x2)
             right_x = max(cell_x1, cell_x2)
             rect = pygame.Rect(left_x, cell_y1 - width // 2, right_x - left_x, width)
-            pygame.draw.rect(self.screen, COLORS['snake_body'], rect)
+            pygame.draw.rect(surface, COLORS['snake_body'], rect)
 
-    def draw_snake_segment(self, x, y, offset_x, offset_y, is_head=False, prev_seg=None, next_seg=None):
-        cell_x = offset_x + x * CELL_SIZE
-        cell_y = offset_y + y * CELL_SIZE
-        center_x = cell_x + CELL_SIZE // 2
-        center_y = cell_y + CELL_SIZE // 2
+    def paint_snake_segment(self, surface, center_x, center_y, is_head):
         if is_head:
             radius = 26
-            pygame.draw.circle(self.screen, COLORS['shadow'], (center_x + 2, center_y + 2), radius)
-            pygame.draw.circle(self.screen, COLORS['snake_head'], (center_x, center_y), radius)
+            pygame.draw.circle(surface, COLORS['shadow'], (center_x + 2, center_y + 2), radius)
+            pygame.draw.circle(surface, COLORS['snake_head'], (center_x, center_y), radius)
             eye_offset_x = 10
             eye_offset_y = -6
             eye_radius = 7
             pupil_radius = 4
             left_eye_pos = (center_x - eye_offset_x, center_y + eye_offset_y)
-            pygame.draw.circle(self.screen, COLORS['snake_eye'], left_eye_pos, eye_radius)
-            pygame.draw.circle(self.screen, COLORS['snake_pupil'], left_eye_pos, pupil_radius)
+            pygame.draw.circle(surface, COLORS['snake_eye'], left_eye_pos, eye_radius)
+            pygame.draw.circle(surface, COLORS['snake_pupil'], left_eye_pos, pupil_radius)
             right_eye_pos = (center_x + eye_offset_x, center_y + eye_offset_y)
-            pygame.draw.circle(self.screen, COLORS['snake_eye'], right_eye_pos, eye_radius)
-            pygame.draw.circle(self.screen, COLORS['snake_pupil'], right_eye_pos, pupil_radius)
+            pygame.draw.circle(surface, COLORS['snake_eye'], right_eye_pos, eye_radius)
+            pygame.draw.circle(surface, COLORS['snake_pupil'], right_eye_pos, pupil_radius)
         else:
             radius = 24
-            pygame.draw.circle(self.screen, COLORS['shadow'], (center_x + 2, center_y + 2), radius)
-            pygame.draw.circle(self.screen, COLORS['snake_body'], (center_x, center_y), radius)
+            pygame.draw.circle(surface, COLORS['shadow'], (center_x + 2, center_y + 2), radius)
+            pygame.draw.circle(surface, COLORS['snake_body'], (center_x, center_y), radius)
             highlight_pos = (center_x - 6, center_y - 6)
-            pygame.draw.circle(self.screen, (100, 255, 100), highlight_pos, 6)
+            pygame.draw.circle(surface, (100, 255, 100), highlight_pos, 6)
 
-    def draw_food(self, x, y, offset_x, offset_y):
-        cell_x = offset_x + x * CELL_SIZE
-        cell_y = offset_y + y * CELL_SIZE
-        center_x = cell_x + CELL_SIZE // 2
-        center_y = cell_y + CELL_SIZE // 2
+    def paint_snake_cell(self, surface, center_x, center_y, is_head, prev_dir, next_dir):
+        # a cell holds its own halves of the links to its neighbours; nothing
+        # drawn for one cell reaches into another, so each cell is one sprite.
+        # The link back to the previous segment goes down first, as the whole
+        # body used to be drawn head to tail
+        for direction in (prev_dir, next_dir):
+            if direction is not None:
+                other = (center_x + direction[0] * CELL_SIZE, center_y + direction[1] * CELL_SIZE)
+                self.paint_snake_connection(surface, (center_x, center_y), other)
+        self.paint_snake_segment(surface, center_x, center_y, is_head)
+
+    def paint_food(self, surface, center_x, center_y):
         radius = 20
-        pygame.draw.circle(self.screen, COLORS['shadow'], (center_x + 2, center_y + 2), radius)
-        pygame.draw.circle(self.screen, COLORS['food'], (center_x, center_y), radius)
+        pygame.draw.circle(surface, COLORS['shadow'], (center_x + 2, center_y + 2), radius)
+        pygame.draw.circle(surface, COLORS['food'], (center_x, center_y), radius)
         highlight_pos = (center_x - 7, center_y - 7)
-        pygame.draw.circle(self.screen, COLORS['food_highlight'], highlight_pos, 7)
+        pygame.draw.circle(surface, COLORS['food_highlight'], highlight_pos, 7)
         stem_rect = pygame.Rect(center_x - 2, center_y - radius - 6, 4, 8)
-        pygame.draw.rect(self.screen, COLORS['food_stem'], stem_rect, border_radius=2)
+        pygame.draw.rect(surface, COLORS['food_stem'], stem_rect, border_radius=2)
         leaf_points = [
             (center_x + 3, center_y - radius - 4),
             (center_x + 10, center_y - radius - 6),
             (center_x + 8, center_y - radius - 1),
         ]
-        pygame.draw.polygon(self.screen, COLORS['food_stem'], leaf_points)
+        pygame.draw.polygon(surface, COLORS['food_stem'], leaf_points)
 
-    def draw_bomb(self, x, y, offset_x, offset_y):
-        cell_x = offset_x + x * CELL_SIZE
-        cell_y = offset_y + y * CELL_SIZE
-        center_x = cell_x + CELL_SIZE // 2
-        center_y = cell_y + CELL_SIZE // 2
+    def paint_bomb(self, surface, center_x, center_y, phase):
         radius = 18
-        pygame.draw.circle(self.screen, COLORS['shadow'], (center_x + 2, center_y + 2), radius)
-        pygame.draw.circle(self.screen, COLORS['bomb'], (center_x, center_y), radius)
+        pygame.draw.circle(surface, COLORS['shadow'], (center_x + 2, center_y + 2), radius)
+        pygame.draw.circle(surface, COLORS['bomb'], (center_x, center_y), radius)
         fuse_start = (center_x, center_y - radius)
         fuse_end = (center_x - 4, center_y - radius - 10)
-        pygame.draw.line(self.screen, (80, 80, 90), fuse_start, fuse_end, 3)
+        pygame.draw.line(surface, (80, 80, 90), fuse_start, fuse_end, 3)
         spark_colors = [(255, 200, 50), (255, 150, 50), (255, 100, 50)]
-        spark_time = pygame.time.get_ticks() % 300
-        if spark_time < 100:
-            pygame.draw.circle(self.screen, spark_colors[0], fuse_end, 4)
-        elif spark_time < 200:
-            pygame.draw.circle(self.screen, spark_colors[1], fuse_end, 3)
-        else:
-            pygame.draw.circle(self.screen, spark_colors[2], fuse_end, 2)
+        pygame.draw.circle(surface, spark_colors[phase], fuse_end, 4 - phase)
         highlight_pos = (center_x - 6, center_y - 6)
-        pygame.draw.circle(self.screen, (80, 80, 90), highlight_pos, 5)
+        pygame.draw.circle(surface, (80, 80, 90), highlight_pos, 5)
 
-    def draw_bomb_count(self, x, y, count, offset_x, offset_y):
-        cell_x = offset_x + x * CELL_SIZE
-        cell_y = offset_y + y * CELL_SIZE
-        center_x = cell_x + CELL_SIZE // 2
-        center_y = cell_y + CELL_SIZE // 2
+    def paint_bomb_count(self, surface, center_x, center_y, count):
         if count == 0:
             color = COLORS['success']
             bg_color = (100, 180, 70)
@@ -350,97 +491,163 @@ class GameGUI:
         )
         shadow_rect = bg_rect.copy()
         shadow_rect.y += 2
-        self.draw_rounded_rect(self.screen, COLORS['shadow'], shadow_rect, 8)
-        self.draw_rounded_rect(self.screen, bg_color, bg_rect, 8)
-        text = self.font_medium.render(str(count), True, COLORS['text'])
+        self.draw_rounded_rect(surface, COLORS['shadow'], shadow_rect, 8)
+        self.draw_rounded_rect(surface, bg_color, bg_rect, 8)
+        text = self.render_text(self.font_medium, str(count), COLORS['text'])
         text_rect = text.get_rect(center=(center_x, center_y))
-        self.screen.blit(text, text_rect)
+        surface.blit(text, text_rect)
 
-    def draw_sidebar(self):
-        sidebar_x = GAME_AREA_WIDTH + PADDING * 2
-        sidebar_y = HEADER_HEIGHT + PADDING * 2
-        sidebar_rect = pygame.Rect(sidebar_x, sidebar_y, SIDEBAR_WIDTH, GAME_AREA_HEIGHT)
+    def build_sprite(self, paint, *args):
+        sprite = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
+        paint(sprite, CELL_SIZE // 2, CELL_SIZE // 2, *args)
+        return sprite
+
+    def build_atlas(self):
+        atlas = {'food': self.build_sprite(self.paint_food)}
+        for phase in range(3):
+            atlas['bomb', phase] = self.build_sprite(self.paint_bomb, phase)
+        for count in range(10):
+            atlas['count', count] = self.build_sprite(self.paint_bomb_count, count)
+        for level in range(1, HEAT_LEVELS + 1):
+            heat = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
+            heat.fill(COLORS['danger'] + (level * 200 // HEAT_LEVELS,))
+            atlas['heat', level] = heat
+        directions = [None] + LINK_DIRECTIONS
+        for is_head in (False, True):
+            for prev_dir in directions:
+                for next_dir in directions:
+                    atlas['snake', is_head, prev_dir, next_dir] = self.build_sprite(
+                        self.paint_snake_cell, is_head, prev_dir, next_dir)
+        return atlas
+
+    def sprite(self, key):
+        return self.layer('atlas', self.build_atlas)[key]
+
+    def link_direction(self, x, y, seg):
+        if seg is None:
+            return None
+        return (seg[0] - x, seg[1] - y)
+
+    def draw_snake_segment(self, x, y, offset_x, offset_y, is_head=False, prev_seg=None, next_seg=None):
+        key = ('snake', is_head, self.link_direction(x, y, prev_seg), self.link_direction(x, y, next_seg))
+        self.screen.blit(self.sprite(key), (offset_x + x * CELL_SIZE, offset_y + y * CELL_SIZE))
+
+    def draw_food(self, x, y, offset_x, offset_y):
+        self.screen.blit(self.sprite('food'), (offset_x + x * CELL_SIZE, offset_y + y * CELL_SIZE))
+
+    def draw_bomb(self, x, y, offset_x, offset_y):
+        phase = pygame.time.get_ticks() % 300 // 100
+        self.screen.blit(self.sprite(('bomb', phase)), (offset_x + x * CELL_SIZE, offset_y + y * CELL_SIZE))
+
+    def draw_bomb_count(self, x, y, count, offset_x, offset_y):
+        self.screen.blit(self.sprite(('count', count)), (offset_x + x * CELL_SIZE, offset_y + y * CELL_SIZE))
+
+    def draw_heat(self, x, y, offset_x, offset_y):
+        level = round(self.inference.probability((x, y)) * HEAT_LEVELS)
+        if level:
+            self.screen.blit(self.sprite(('heat', level)), (offset_x + x * CELL_SIZE, offset_y + y * CELL_SIZE))
+
+    def sidebar_layout(self):
+        info_title_y = 20 + 50 + len(SIDEBAR_CONTROLS) * 30 + 20
+        info_y = info_title_y + 40
+        scores_title_y = info_y + 3 * 30 + 20
+        scores_y = scores_title_y + 40
+        return info_title_y, info_y, scores_title_y, scores_y
+
+    def build_sidebar_layer(self):
+        area = self.sidebar_area()
+        layer = pygame.Surface(area.size)
+        layer.fill(COLORS['bg'])
+        sidebar_rect = pygame.Rect(0, 0, SIDEBAR_WIDTH, self.game_area_height)
         shadow_rect = sidebar_rect.copy()
         shadow_rect.y += 4
-        self.draw_rounded_rect(self.screen, COLORS['shadow'], shadow_rect, 20)
-        self.draw_rounded_rect(self.screen, COLORS['sidebar'], sidebar_rect, 20)
-        y_offset = sidebar_y + 20
-        title = self.font_medium.render("Controls", True, COLORS['accent'])
-        self.screen.blit(title, (sidebar_x + 20, y_offset))
+        self.draw_rounded_rect(layer, COLORS['shadow'], shadow_rect, 20)
+        self.draw_rounded_rect(layer, COLORS['sidebar'], sidebar_rect, 20)
+        y_offset = 20
+        title = self.render_text(self.font_medium, "Controls", COLORS['accent'])
+        layer.blit(title, (20, y_offset))
         y_offset += 50
-        instructions = [
-            ("WASD / Arrows", "Move"),
-            ("Z", "Undo move"),
-            ("R", "Restart game"),
-            ("L", "Leaderboard"),
-            ("Q / ESC", "Quit"),
-        ]
-        for key, action in instructions:
-            key_text = self.font_tiny.render(key, True, COLORS['warning'])
-            action_text = self.font_tiny.render(action, True, COLORS['text_dim'])
-            self.screen.blit(key_text, (sidebar_x + 20, y_offset))
-            self.screen.blit(action_text, (sidebar_x + 140, y_offset))
+        for key, action in SIDEBAR_CONTROLS:
+            key_text = self.render_text(self.font_tiny, key, COLORS['warning'])
+            action_text = self.render_text(self.font_tiny, action, COLORS['text_dim'])
+            layer.blit(key_text, (20, y_offset))
+            layer.blit(action_text, (140, y_offset))
             y_offset += 30
-        y_offset += 20
-        info_title = self.font_medium.render("Game Info", True, COLORS['accent'])
-        self.screen.blit(info_title, (sidebar_x + 20, y_offset))
-        y_offset += 40
+        info_title_y, _, scores_title_y, _ = self.sidebar_layout()
+        info_title = self.render_text(self.font_medium, "Game Info", COLORS['accent'])
+        layer.blit(info_title, (20, info_title_y))
+        leaderboard_title = self.render_text(self.font_medium, "Top 3 Scores", COLORS['accent'])
+        layer.blit(leaderboard_title, (20, scores_title_y))
+        return layer
+
+    def draw_sidebar(self):
+        area = self.sidebar_area()
+        self.screen.blit(self.layer('sidebar', self.build_sidebar_layer), area)
+        sidebar_x = area.x
+        _, info_y, _, scores_y = self.sidebar_layout()
+        y_offset = area.y + info_y
         info_lines = [
             f"Snake Length: {self.snake.length}",
             f"Food Left: {len(self.food_set)}",
             f"Total Bombs: {len(self.bombs)}",
         ]
         for line in info_lines:
-            text = self.font_tiny.render(line, True, COLORS['text'])
+            text = self.render_text(self.font_tiny, line, COLORS['text'])
             self.screen.blit(text, (sidebar_x + 20, y_offset))
             y_offset += 30
-        y_offset += 20
-        leaderboard_title = self.font_medium.render("Top 3 Scores", True, COLORS['accent'])
-        self.screen.blit(leaderboard_title, (sidebar_x + 20, y_offset))
-        y_offset += 40
+        y_offset = area.y + scores_y
         top_scores = self.get_top_leaderboard(3)
         if top_scores:
             for i, (name, score) in enumerate(top_scores, start=1):
                 display_name = name[:10] + "..." if len(name) > 10 else name
                 score_line = f"{i}. {display_name}: {score}"
                 score_color = COLORS['accent'] if i == 1 else COLORS['text']
-                text = self.font_tiny.render(score_line, True, score_color)
+                text = self.render_text(self.font_tiny, score_line, score_color)
                 self.screen.blit(text, (sidebar_x + 20, y_offset))
                 y_offset += 30
         else:
-            no_scores = self.font_tiny.render("No scores yet!", True, COLORS['text_dim'])
+            no_scores = self.render_text(self.font_tiny, "No scores yet!", COLORS['text_dim'])
             self.screen.blit(no_scores, (sidebar_x + 20, y_offset))
             y_offset += 30
         y_offset += 10
-        hint = self.font_tiny.render("Press L for full list", True, COLORS['text_dim'])
+        hint = self.render_text(self.font_tiny, "Press L for full list", COLORS['text_dim'])
         self.screen.blit(hint, (sidebar_x + 20, y_offset))
 
-    def draw_leaderboard_screen(self):
-        self.screen.fill(COLORS['bg'])
+    def leaderboard_box(self):
         box_width = 600
         box_height = 600
-        box_x = (WINDOW_WIDTH - box_width) // 2
-        box_y = (WINDOW_HEIGHT - box_height) // 2
-        shadow_rect = pygame.Rect(box_x, box_y + 4, box_width, box_height)
-        self.draw_rounded_rect(self.screen, COLORS['shadow'], shadow_rect, 20)
-        box_rect = pygame.Rect(box_x, box_y, box_width, box_height)
-        self.draw_rounded_rect(self.screen, COLORS['header'], box_rect, 20)
-        pygame.draw.rect(self.screen, COLORS['accent'], box_rect, 4, border_radius=20)
-        title = self.font_large.render("LEADERBOARD", True, COLORS['accent'])
-        title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, box_y + 50))
-        self.screen.blit(title, title_rect)
+        box_x = (self.window_width - box_width) // 2
+        box_y = (self.window_height - box_height) // 2
+        return pygame.Rect(box_x, box_y, box_width, box_height)
+
+    def build_leaderboard_layer(self):
+        layer = pygame.Surface((self.window_width, self.window_height))
+        layer.fill(COLORS['bg'])
+        box_rect = self.leaderboard_box()
+        box_x, box_y, box_width = box_rect.x, box_rect.y, box_rect.width
+        shadow_rect = box_rect.move(0, 4)
+        self.draw_rounded_rect(layer, COLORS['shadow'], shadow_rect, 20)
+        self.draw_rounded_rect(layer, COLORS['header'], box_rect, 20)
+        pygame.draw.rect(layer, COLORS['accent'], box_rect, 4, border_radius=20)
+        self.blit_centered(layer, "LEADERBOARD", self.font_large, COLORS['accent'], (self.window_width // 2, box_y + 50))
         divider_y = box_y + 90
-        pygame.draw.line(self.screen, COLORS['accent'], 
-                        (box_x + 40, divider_y), 
+        pygame.draw.line(layer, COLORS['accent'],
+                        (box_x + 40, divider_y),
                         (box_x + box_width - 40, divider_y), 3)
         y_offset = box_y + 110
-        rank_header = self.font_small.render("RANK", True, COLORS['accent'])
-        name_header = self.font_small.render("NAME", True, COLORS['accent'])
-        score_header = self.font_small.render("SCORE", True, COLORS['accent'])
-        self.screen.blit(rank_header, (box_x + 60, y_offset))
-        self.screen.blit(name_header, (box_x + 200, y_offset))
-        self.screen.blit(score_header, (box_x + 450, y_offset))
-        y_offset += 45
+        rank_header = self.render_text(self.font_small, "RANK", COLORS['accent'])
+        name_header = self.render_text(self.font_small, "NAME", COLORS['accent'])
+        score_header = self.render_text(self.font_small, "SCORE", COLORS['accent'])
+        layer.blit(rank_header, (box_x + 60, y_offset))
+        layer.blit(name_header, (box_x + 200, y_offset))
+        layer.blit(score_header, (box_x + 450, y_offset))
+        return layer
+
+    def draw_leaderboard_screen(self):
+        self.screen.blit(self.layer('leaderboard', self.build_leaderboard_layer), (0, 0))
+        box_rect = self.leaderboard_box()
+        box_x, box_y, box_width, box_height = box_rect
+        y_offset = box_y + 155
         top_scores = self.get_top_leaderboard(10)
         if top_scores:
             for i, (name, score) in enumerate(top_scores, start=1):
@@ -460,117 +667,107 @@ class GameGUI:
                     rank_text = f"{i}."
                     text_color = COLORS['text_dim']
                 display_name = name[:20] if len(name) <= 20 else name[:17] + "..."
-                rank_surface = self.font_small.render(rank_text, True, text_color)
-                name_surface = self.font_small.render(display_name, True, text_color)
-                score_surface = self.font_small.render(str(score), True, text_color)
+                rank_surface = self.render_text(self.font_small, rank_text, text_color)
+                name_surface = self.render_text(self.font_small, display_name, text_color)
+                score_surface = self.render_text(self.font_small, str(score), text_color)
                 self.screen.blit(rank_surface, (box_x + 60, y_offset))
                 self.screen.blit(name_surface, (box_x + 200, y_offset))
                 self.screen.blit(score_surface, (box_x + 450, y_offset))
                 y_offset += 42
         else:
-            no_scores = self.font_medium.render("No scores yet!", True, COLORS['text_dim'])
-            no_scores_rect = no_scores.get_rect(center=(WINDOW_WIDTH // 2, box_y + 300))
+            no_scores = self.render_text(self.font_medium, "No scores yet!", COLORS['text_dim'])
+            no_scores_rect = no_scores.get_rect(center=(self.window_width // 2, box_y + 300))
             self.screen.blit(no_scores, no_scores_rect)
-            play_msg = self.font_small.render("Play a game to get on the board!", True, COLORS['text_dim'])
-            play_rect = play_msg.get_rect(center=(WINDOW_WIDTH // 2, box_y + 340))
+            play_msg = self.render_text(self.font_small, "Play a game to get on the board!", COLORS['text_dim'])
+            play_rect = play_msg.get_rect(center=(self.window_width // 2, box_y + 340))
             self.screen.blit(play_msg, play_rect)
-        instruction = self.font_small.render("Press L to return to game  |  Press Q to quit", True, COLORS['text_dim'])
-        instruction_rect = instruction.get_rect(center=(WINDOW_WIDTH // 2, box_y + box_height - 30))
+        instruction = self.render_text(self.font_small, "Press L to return to game  |  Press Q to quit", COLORS['text_dim'])
+        instruction_rect = instruction.get_rect(center=(self.window_width // 2, box_y + box_height - 30))
         self.screen.blit(instruction, instruction_rect)
 
+    def modal_box(self, width, height):
+        return pygame.Rect((self.window_width - width) // 2, (self.window_height - height) // 2, width, height)
+
+    def build_name_input_panel(self):
+        box_rect = self.modal_box(500, 250)
+        panel = self.build_panel(box_rect.width, box_rect.height, 20, 4)
+        center_x = self.window_width // 2 - box_rect.x
+        self.blit_centered(panel, "Game Over!", self.font_large, COLORS['accent'], (center_x, 50))
+        self.blit_centered(panel, "Enter your name:", self.font_small, COLORS['text'], (center_x, 140))
+        input_box = pygame.Rect(100, 165, 300, 40)
+        self.draw_rounded_rect(panel, COLORS['button'], input_box, 10)
+        pygame.draw.rect(panel, COLORS['accent'], input_box, 2, border_radius=10)
+        self.blit_centered(panel, "Press ENTER to save, ESC to skip", self.font_tiny, COLORS['text_dim'], (center_x, 220))
+        return panel
+
+    def build_game_over_panel(self, victory):
+        box_rect = self.modal_box(500, 300)
+        panel = self.build_panel(box_rect.width, box_rect.height, 20, 4)
+        center_x = self.window_width // 2 - box_rect.x
+        title_color = COLORS['success'] if victory else COLORS['danger']
+        title_text = "Victory!" if victory else "Game Over!"
+        self.blit_centered(panel, title_text, self.font_large, title_color, (center_x, 60))
+        self.blit_centered(panel, "Press R to Restart or Q to Quit", self.font_small, COLORS['text_dim'], (center_x, 240))
+        return panel
+
     def draw_game_over(self):
         if getattr(self, 'show_trial_popup', False) or getattr(self, 'show_settings_modal', False):
             return
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        overlay.set_alpha(230)
-        overlay.fill(COLORS['bg'])
-        self.screen.blit(overlay, (0, 0))
+        self.screen.blit(self.layer(('overlay', 230), lambda: self.build_overlay(230)), (0, 0))
         if self.show_name_input:
-            box_width = 500
-            box_height = 250
-            box_x = (WINDOW_WIDTH - box_width) // 2
-            box_y = (WINDOW_HEIGHT - box_height) // 2
-            box_rect = pygame.Rect(box_x, box_y, box_width, box_height)
-            self.draw_rounded_rect(self.screen, COLORS['header'], box_rect, 20)
-            pygame.draw.rect(self.screen, COLORS['accent'], box_rect, 4, border_radius=20)
-            title = self.font_large.render("Game Over!", True, COLORS['accent'])
-            title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, box_y + 50))
-            self.screen.blit(title, title_rect)
-            score_text = self.font_medium.render(f"Score: {self.score}", True, COLORS['success'])
-            score_rect = score_text.get_rect(center=(WINDOW_WIDTH // 2, box_y + 100))
+            box_rect = self.modal_box(500, 250)
+            box_x, box_y = box_rect.topleft
+            self.screen.blit(self.layer('name_input', self.build_name_input_panel), box_rect)
+            score_text = self.render_text(self.font_medium, f"Score: {self.score}", COLORS['success'])
+            score_rect = score_text.get_rect(center=(self.window_width // 2, box_y + 100))
             self.screen.blit(score_text, score_rect)
-            prompt = self.font_small.render("Enter your name:", True, COLORS['text'])
-            prompt_rect = prompt.get_rect(center=(WINDOW_WIDTH // 2, box_y + 140))
-            self.screen.blit(prompt, prompt_rect)
             input_box = pygame.Rect(box_x + 100, box_y + 165, 300, 40)
-            self.draw_rounded_rect(self.screen, COLORS['button'], input_box, 10)
-            pygame.draw.rect(self.screen, COLORS['accent'], input_box, 2, border_radius=10)
-            text_surface = self.font_small.render(self.name_input_text + "_", True, COLORS['text'])
+            text_surface = self.render_text(self.font_small, self.name_input_text + "_", COLORS['text'])
             text_rect = text_surface.get_rect(left=input_box.left + 10, centery=input_box.centery)
             self.screen.blit(text_surface, text_rect)
-            instruction = self.font_tiny.render("Press ENTER to save, ESC to skip", True, COLORS['text_dim'])
-            instruction_rect = instruction.get_rect(center=(WINDOW_WIDTH // 2, box_y + 220))
-            self.screen.blit(instruction, instruction_rect)
         else:
-            box_width = 500
-            box_height = 300
-            box_x = (WINDOW_WIDTH - box_width) // 2
-            box_y = (WINDOW_HEIGHT - box_height) // 2
-            box_rect = pygame.Rect(box_x, box_y, box_width, box_height)
-            self.draw_rounded_rect(self.screen, COLORS['header'], box_rect, 20)
-            pygame.draw.rect(self.screen, COLORS['accent'], box_rect, 4, border_radius=20)
-            title_color = COLORS['success'] if self.victory else COLORS['danger']
-            title_text = "Victory!" if self.victory else "Game Over!"
-            title = self.font_large.render(title_text, True, title_color)
-            title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, box_y + 60))
-            self.screen.blit(title, title_rect)
-            message = self.font_medium.render(self.game_over_message, True, COLORS['text'])
-            message_rect = message.get_rect(center=(WINDOW_WIDTH // 2, box_y + 120))
+            box_rect = self.modal_box(500, 300)
+            box_y = box_rect.y
+            victory = self.victory
+            self.screen.blit(self.layer(('game_over', victory), lambda: self.build_game_over_panel(victory)), box_rect)
+            message = self.render_text(self.font_medium, self.game_over_message, COLORS['text'])
+            message_rect = message.get_rect(center=(self.window_width // 2, box_y + 120))
             self.screen.blit(message, message_rect)
-            score_text = self.font_medium.render(f"Final Score: {self.score}", True, COLORS['accent'])
-            score_rect = score_text.get_rect(center=(WINDOW_WIDTH // 2, box_y + 170))
+            score_text = self.render_text(self.font_medium, f"Final Score: {self.score}", COLORS['accent'])
+            score_rect = score_text.get_rect(center=(self.window_width // 2, box_y + 170))
             self.screen.blit(score_text, score_rect)
-            restart = self.font_small.render("Press R to Restart or Q to Quit", True, COLORS['text_dim'])
-            restart_rect = restart.get_rect(center=(WINDOW_WIDTH // 2, box_y + 240))
-            self.screen.blit(restart, restart_rect)
+
+    def build_trial_panel(self):
+        box_rect = self.modal_box(480, 180)
+        panel = self.build_panel(box_rect.width, box_rect.height, 16, 3)
+        center_x = self.window_width // 2 - box_rect.x
+        self.blit_centered(panel, "Trial Over", self.font_large, COLORS['accent'], (center_x, 36))
+        self.blit_centered(panel, "Ready for the full game?", self.font_medium, COLORS['text'], (center_x, 80))
+        self.blit_centered(panel, "ENTER = Settings & Play   |   ESC = Quit", self.font_small, COLORS['text_dim'], (center_x, 125))
+        return panel
 
     def draw_trial_popup(self):
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        overlay.set_alpha(220)
-        overlay.fill(COLORS['bg'])
-        self.screen.blit(overlay, (0, 0))
-        box_width = 480
-        box_height = 180
-        box_x = (WINDOW_WIDTH - box_width) // 2
-        box_y = (WINDOW_HEIGHT - box_height) // 2
-        box_rect = pygame.Rect(box_x, box_y, box_width, box_height)
-        self.draw_rounded_rect(self.screen, COLORS['header'], box_rect, 16)
-        pygame.draw.rect(self.screen, COLORS['accent'], box_rect, 3, border_radius=16)
-        title = self.font_large.render("Trial Over", True, COLORS['accent'])
-        title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, box_y + 36))
-        self.screen.blit(title, title_rect)
-        msg = "Ready for the full game?"
-        msg_surf = self.font_medium.render(msg, True, COLORS['text'])
-        msg_rect = msg_surf.get_rect(center=(WINDOW_WIDTH // 2, box_y + 80))
-        self.screen.blit(msg_surf, msg_rect)
-        instr = "ENTER = Settings & Play   |   ESC = Quit"
-        instr_surf = self.font_small.render(instr, True, COLORS['text_dim'])
-        instr_rect = instr_surf.get_rect(center=(WINDOW_WIDTH // 2, box_y + 125))
-        self.screen.blit(instr_surf, instr_rect)
+        self.screen.blit(self.layer(('overlay', 220), lambda: self.build_overlay(220)), (0, 0))
+        self.screen.blit(self.layer('trial', self.build_trial_panel), self.modal_box(480, 180))
+
+    def build_settings_panel(self):
+        box = self.modal_box(520, 220)
+        w, h = box.size
+        panel = self.build_panel(w, h, 14, 3)
+        title = self.render_text(self.font_medium, "Full Game Settings", COLORS['accent'])
+        panel.blit(title, (20, 12))
+        food_label = self.render_text(self.font_medium, "Food items:", COLORS['text'])
+        panel.blit(food_label, (30, 58))
+        bomb_label = self.render_text(self.font_medium, "Bombs:", COLORS['text'])
+        panel.blit(bomb_label, (30, 108))
+        self.blit_centered(panel, "Click Field to Edit   |   ENTER = Start   |   ESC = Cancel", self.font_small, COLORS['text_dim'], (w // 2, h - 18))
+        return panel
 
     def draw_settings_modal(self):
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        overlay.set_alpha(200)
-        overlay.fill(COLORS['bg'])
-        self.screen.blit(overlay, (0, 0))
-        w, h = 520, 220
-        x = (WINDOW_WIDTH - w) // 2
-        y = (WINDOW_HEIGHT - h) // 2
-        box = pygame.Rect(x, y, w, h)
-        self.draw_rounded_rect(self.screen, COLORS['header'], box, 14)
-        pygame.draw.rect(self.screen, COLORS['accent'], box, 3, border_radius=14)
-        title = self.font_medium.render("Full Game Settings", True, COLORS['accent'])
-        self.screen.blit(title, (x + 20, y + 12))
+        self.screen.blit(self.layer(('overlay', 200), lambda: self.build_overlay(200)), (0, 0))
+        box = self.modal_box(520, 220)
+        x, y = box.topleft
+        self.screen.blit(self.layer('settings', self.build_settings_panel), box)
         def clamp_display(text, font, max_w):
             display = text
             while display and font.size(display)[0] > max_w:
@@ -578,26 +775,18 @@ class GameGUI:
             if display != text and display:
                 display = '…' + display
             return display
-        food_label = self.font_medium.render("Food items:", True, COLORS['text'])
-        self.screen.blit(food_label, (x + 30, y + 58))
         food_box = pygame.Rect(x + 260, y + 52, 220, 38)
         color = COLORS['button_hover'] if self.settings_field == 'food' else COLORS['button']
         self.draw_rounded_rect(self.screen, color, food_box, 10)
         food_display = clamp_display(self.settings_food_text, self.font_medium, food_box.width - 20)
-        food_text_surf = self.font_medium.render(food_display, True, COLORS['text'])
+        food_text_surf = self.render_text(self.font_medium, food_display, COLORS['text'])
         self.screen.blit(food_text_surf, (food_box.x + 12, food_box.y + (food_box.height - food_text_surf.get_height()) // 2))
-        bomb_label = self.font_medium.render("Bombs:", True, COLORS['text'])
-        self.screen.blit(bomb_label, (x + 30, y + 108))
         bomb_box = pygame.Rect(x + 260, y + 102, 220, 38)
         color = COLORS['button_hover'] if self.settings_field == 'bomb' else COLORS['button']
         self.draw_rounded_rect(self.screen, color, bomb_box, 10)
         bomb_display = clamp_display(self.settings_bomb_text, self.font_medium, bomb_box.width - 20)
-        bomb_text_surf = self.font_medium.render(bomb_display, True, COLORS['text'])
+        bomb_text_surf = self.render_text(self.font_medium, bomb_display, COLORS['text'])
         self.screen.blit(bomb_text_surf, (bomb_box.x + 12, bomb_box.y + (bomb_box.height - bomb_text_surf.get_height()) // 2))
-        hint = self.font_small.render("Click Field to Edit   |   ENTER = Start   |   ESC = Cancel", True, COLORS['text_dim'])
-        hint_rect = hint.get_rect(center=(x + w // 2, y + h - 18))
-        self.screen.blit(hint, hint_rect)
-        
         cursor_time = pygame.time.get_ticks() % 1000
         if cursor_time < 500:  
             if self.settings_field == 'food':
@@ -616,89 +805,237 @@ class GameGUI:
         if current_time - self.last_move_time < self.move_cooldown:
             return
         self.last_move_time = current_time
-        dx, dy = direction
-        head_x, head_y = self.snake.head.x, self.snake.head.y
-        new_x, new_y = head_x + dx, head_y + dy
-        if new_x < 0 or new_x >= BOARD_WIDTH or new_y < 0 or new_y >= BOARD_HEIGHT:
-            self.game_over = True
-            self.game_over_message = "Hit the wall!"
-            if self.trial:
-                self.show_trial_popup = True
-            else:
-                self.show_name_input = True
-            return
-        if (new_x, new_y) in self.snake.positions:
-            self.game_over = True
-            self.game_over_message = "Ate yourself!"
-            if self.trial:
-                self.show_trial_popup = True
-            else:
-                self.show_name_input = True
-            return
-        if (new_x, new_y) in self.bombs:
+        outcome = self.state.step(direction)
+        messages = {
+            HIT_WALL: "Hit the wall!",
+            HIT_SELF: "Ate yourself!",
+            HIT_BOMB: "Hit a bomb!",
+        }
+        if outcome in messages:
             self.game_over = True
-            self.game_over_message = "Hit a bomb!"
+            self.game_over_message = messages[outcome]
             if self.trial:
                 self.show_trial_popup = True
             else:
                 self.show_name_input = True
-            return
-        self.snake.add_head(new_x, new_y)
-        removed_tail = None
-        ate = False
-        eaten_pos = None
-        respawned_food = None
-        if (new_x, new_y) in self.food_set:
-            ate = True
-            eaten_pos = (new_x, new_y)
-            if not self.trial:
-                self.score += 10
-            self.food_set.discard(eaten_pos)
-            pos = random_free_position(self.snake.positions, self.food_set, self.bombs, BOARD_WIDTH, BOARD_HEIGHT)
-            if pos is not None:
-                self.food_set.add(pos)
-                respawned_food = pos
-        else:
-            removed_tail = self.snake.remove_tail()
-        move_info = {
-            'head': (new_x, new_y),
-            'removed_tail': removed_tail,
-            'ate': ate,
-            'eaten_pos': eaten_pos,
-            'respawned_food': respawned_food,
-        }
-        self.undo_stack.append(('move', move_info))
 
     def handle_undo(self):
-        if self.remaining_undos <= 0:
+        result = self.state.undo()
+        if result == NO_UNDOS_LEFT:
             print("No more undos available!")
-            return
-        if not self.undo_stack:
+        elif result == NOTHING_TO_UNDO:
             print("Nothing to undo!")
+
+    def handle_redo(self):
+        if self.state.redo() == NOTHING_TO_REDO:
+            print("Nothing to redo!")
+
+    def toggle_autopilot(self):
+        self.autopilot = None if self.autopilot is not None else Autopilot(self.state, inference=self.inference)
+        print(f"Autopilot {'on' if self.autopilot is not None else 'off'}")
+
+    def toggle_heatmap(self):
+        self.show_heatmap = not self.show_heatmap
+        self.full_redraw = True
+
+    def drive_autopilot(self):
+        # moves at the same pace as held keys; the route is only planned when
+        # a move is actually due
+        if self.autopilot is None or self.modal_open():
             return
-        kind, info = self.undo_stack.pop()
-        if kind != 'move':
+        if pygame.time.get_ticks() - self.last_move_time >= self.move_cooldown:
+            self.handle_move(self.autopilot.decide())
+
+    def draw_frame(self):
+        if self.show_leaderboard_screen:
+            with self.profiler.phase('overlays'):
+                self.draw_leaderboard_screen()
             return
-        self.snake.remove_head()
-        if info.get('ate'):
-            if not self.trial:
-                self.score -= 10
-            respawned = info.get('respawned_food')
-            if respawned and respawned in self.food_set:
-                self.food_set.discard(respawned)
-            eaten_pos = info.get('eaten_pos')
-            if eaten_pos:
-                self.food_set.add(eaten_pos)
-        else:
-            removed_tail = info.get('removed_tail')
-            if removed_tail:
-                self.snake.append_tail(removed_tail)
-        self.remaining_undos -= 1
+        self.screen.fill(COLORS['bg'])
+        with self.profiler.phase('draw_header'):
+            self.draw_header()
+        with self.profiler.phase('draw_board'):
+            self.draw_board()
+        with self.profiler.phase('draw_sidebar'):
+            self.draw_sidebar()
+        with self.profiler.phase('overlays'):
+            if self.show_trial_popup:
+                self.draw_trial_popup()
+            elif self.show_settings_modal:
+                self.draw_settings_modal()
+            elif self.game_over:
+                self.draw_game_over()
+
+    def header_area(self):
+        return pygame.Rect(PADDING, PADDING, self.window_width - PADDING * 2, HEADER_HEIGHT + 4)
+
+    def sidebar_area(self):
+        return pygame.Rect(self.game_area_width + PADDING * 2, HEADER_HEIGHT + PADDING * 2,
+                           SIDEBAR_WIDTH, self.game_area_height + 4)
+
+    def hud_signatures(self):
+        header = (self.score, self.remaining_undos, self.trial)
+        sidebar = (self.snake.length, len(self.food_set), len(self.bombs), tuple(map(tuple, self.get_top_leaderboard(3))))
+        return header, sidebar
+
+    def spark_phase(self):
+        return pygame.time.get_ticks() % 300 // SPARK_INTERVAL if self.trial else None
+
+    def modal_open(self):
+        return (self.show_leaderboard_screen or self.show_trial_popup
+                or self.show_settings_modal or self.game_over)
+
+    def next_deadline(self, now):
+        deadline = self.last_sync_time + self.sync_interval
+        if self.show_leaderboard_screen:
+            return deadline
+        if self.trial:
+            deadline = min(deadline, now - now % SPARK_INTERVAL + SPARK_INTERVAL)
+        if self.show_settings_modal and not self.show_trial_popup:
+            deadline = min(deadline, now - now % CURSOR_BLINK + CURSOR_BLINK)
+        return deadline
+
+    def wait_events(self):
+        now = pygame.time.get_ticks()
+        if not self.modal_open() and (self.autopilot is not None or now - self.last_input_time < ACTIVE_WINDOW):
+            self.clock.tick(FRAME_RATE)
+            return pygame.event.get()
+        timeout = self.next_deadline(now) - now
+        if timeout <= 0:
+            return pygame.event.get()
+        event = pygame.event.wait(timeout)
+        if event.type == pygame.NOEVENT:
+            return []
+        return [event] + pygame.event.get()
+
+    def render(self):
+        # the engine only runs while the map is shown (the autopilot syncs it
+        # itself); any re-solve can move the background odds, so the map is
+        # redrawn whole
+        if self.show_heatmap and self.inference.sync(self.state):
+            self.full_redraw = True
+        modal = self.modal_open()
+        changed = self.state.take_dirty()
+        head = self.snake.head_coordinates()
+        header_sig, sidebar_sig = self.hud_signatures()
+        spark = self.spark_phase()
+        if modal or self.full_redraw or self.view_origin() != self.view:
+            self.full_redraw = modal
+            self.draw_frame()
+            if self.show_profile:
+                self.draw_profile_overlay()
+            with self.profiler.phase('present'):
+                pygame.display.flip()
+            self.header_sig, self.sidebar_sig = header_sig, sidebar_sig
+            self.last_head = head
+            self.last_spark = spark
+            return
+        rects = []
+        if header_sig != self.header_sig:
+            area = self.header_area()
+            with self.profiler.phase('draw_header'):
+                self.draw_header()
+            rects.append(area)
+            self.header_sig = header_sig
+        if sidebar_sig != self.sidebar_sig:
+            area = self.sidebar_area()
+            with self.profiler.phase('draw_sidebar'):
+                self.draw_sidebar()
+            rects.append(area)
+            self.sidebar_sig = sidebar_sig
+        cells = set(changed)
+        if changed:
+            for hx, hy in (self.last_head, head):
+                for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
+                    pos = (hx + dx, hy + dy)
+                    if pos not in self.snake.positions:
+                        cells.add(pos)
+        if spark != self.last_spark:
+            cells.update(self.bombs)
+        self.last_head = head
+        self.last_spark = spark
+        cells = [pos for pos in cells if self.in_view(*pos)]
+        if cells:
+            with self.profiler.phase('draw_board'):
+                links = self.snake_end_links()
+                for x, y in cells:
+                    rects.append(self.redraw_cell(x, y, links))
+        if self.show_profile:
+            # drawn last every frame so cells redrawn underneath never cover it
+            rects.append(self.draw_profile_overlay())
+        if rects:
+            with self.profiler.phase('present'):
+                pygame.display.update(rects)
+
+    def toggle_profile_overlay(self):
+        self.show_profile = not self.show_profile
+        if self.show_profile:
+            self.profiler.enabled = True
+        self.full_redraw = True
+
+    def draw_profile_overlay(self):
+        lines = self.profiler.summary_lines()
+        line_height = self.font_tiny.get_linesize()
+        panel = pygame.Rect(PADDING, PADDING, 260, line_height * len(lines) + 12)
+        pygame.draw.rect(self.screen, COLORS['shadow'], panel)
+        for i, line in enumerate(lines):
+            text = self.render_text(self.font_tiny, line, COLORS['accent'] if i == 0 else COLORS['text'])
+            self.screen.blit(text, (panel.x + 8, panel.y + 6 + i * line_height))
+        return panel
+
+    def snake_end_links(self):
+        # only cells near the head or tail are ever redrawn individually,
+        # so body order is needed just for the first and last few segments
+        n = self.snake.length
+        order = sorted({i for i in (0, 1, 2, n - 3, n - 2, n - 1) if 0 <= i < n})
+        segs = {i: self.snake.segment(i) for i in order}
+        links = {}
+        for i in order:
+            neighbours = []
+            for j in (i - 1, i + 1):
+                if 0 <= j < n:
+                    neighbours.append(segs[j] if j in segs else self.snake.segment(j))
+                else:
+                    neighbours.append(None)
+            links[segs[i]] = neighbours
+        return links
+
+    def redraw_cell(self, x, y, links):
+        board_x = PADDING
+        board_y = HEADER_HEIGHT + PADDING * 2
+        view_x, view_y = self.view
+        offset_x = board_x - view_x * CELL_SIZE
+        offset_y = board_y - view_y * CELL_SIZE
+        rect = pygame.Rect(offset_x + x * CELL_SIZE, offset_y + y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+        self.screen.set_clip(rect)
+        self.screen.blit(self.board_layer(), (board_x, board_y))
+        if self.show_heatmap:
+            self.draw_heat(x, y, offset_x, offset_y)
+        pos = (x, y)
+        if self.trial and pos in self.bombs:
+            self.draw_bomb(x, y, offset_x, offset_y)
+        if pos in self.food_set:
+            self.draw_food(x, y, offset_x, offset_y)
+        if pos in self.snake.positions:
+            self.draw_snake_segment(x, y, offset_x, offset_y, pos == self.snake.head_coordinates(), *links.get(pos, ()))
+        elif pos not in self.food_set:
+            head_x, head_y = self.snake.head_coordinates()
+            if abs(head_x - x) + abs(head_y - y) == 1:
+                self.draw_bomb_count(x, y, count_adjacent_bombs(x, y, self.bombs), offset_x, offset_y)
+        self.screen.set_clip(None)
+        return rect
 
     def run(self):
+        pygame.event.set_blocked(pygame.MOUSEMOTION)
         running = True
         while running:
-            for event in pygame.event.get():
+            events = self.wait_events()
+            self.profiler.begin_frame()
+            for event in events:
+                if event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                    self.last_input_time = pygame.time.get_ticks()
+                if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    self.full_redraw = True
                 if event.type == pygame.QUIT:
                     if self.trial and not self.show_trial_popup:
                         self.show_trial_popup = True
@@ -707,8 +1044,8 @@ class GameGUI:
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     if self.show_settings_modal and event.button == 1:  
                         w, h = 520, 220
-                        x = (WINDOW_WIDTH - w) // 2
-                        y = (WINDOW_HEIGHT - h) // 2
+                        x = (self.window_width - w) // 2
+                        y = (self.window_height - h) // 2
                         food_box = pygame.Rect(x + 260, y + 52, 220, 38)
                         bomb_box = pygame.Rect(x + 260, y + 102, 220, 38)
                         
@@ -717,7 +1054,9 @@ class GameGUI:
                         elif bomb_box.collidepoint(event.pos):
                             self.settings_field = 'bomb'
                 elif event.type == pygame.KEYDOWN:
-                    if self.show_name_input:
+                    if event.key == pygame.K_F3:
+                        self.toggle_profile_overlay()
+                    elif self.show_name_input:
                         if event.key == pygame.K_RETURN:
                             name_to_save = self.name_input_text.strip() if self.name_input_text.strip() else 'Anonymous'
                             self.save_score(name_to_save, self.score)
@@ -784,22 +1123,26 @@ class GameGUI:
                             self.reset_game()
                         elif event.key == pygame.K_z and not self.show_leaderboard_screen:
                             self.handle_undo()
+                        elif event.key == pygame.K_y and not self.show_leaderboard_screen:
+                            self.handle_redo()
+                        elif event.key == pygame.K_p and not self.show_leaderboard_screen:
+                            self.toggle_autopilot()
+                        elif event.key == pygame.K_h and not self.show_leaderboard_screen:
+                            self.toggle_heatmap()
                         elif event.key in DIRECTIONS and not self.game_over and not self.show_leaderboard_screen:
                             self.handle_move(DIRECTIONS[event.key])
-            if self.show_leaderboard_screen:
-                self.draw_leaderboard_screen()
-            else:
-                self.screen.fill(COLORS['bg'])
-                self.draw_header()
-                self.draw_board()
-                self.draw_sidebar()
-                if self.show_trial_popup:
-                    self.draw_trial_popup()
-                elif self.show_settings_modal:
-                    self.draw_settings_modal()
-                elif self.game_over:
-                    self.draw_game_over()
-            pygame.display.flip()
-            self.clock.tick(60)
+            self.drive_autopilot()
+            now = pygame.time.get_ticks()
+            if now - self.last_sync_time >= self.sync_interval:
+                self.last_sync_time = now
+                self.store.sync(self.leaderboard)
+            self.profiler.lap('events')
+            self.render()
+            self.profiler.end_frame()
+        self.store.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.profile_file:
+            self.profiler.dump(self.profile_file)
         pygame.quit()
         return self.score
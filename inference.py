@@ -0,0 +1,399 @@
+import math
+import sys
+import time
+import numpy as np
+from gamelogic import GameState, count_adjacent_bombs, MOVED, ATE, RECORD_SIZE
+
+ENUM_LIMIT = 32
+ENUM_BUDGET = 10000
+FIT_ROUNDS = 8
+FIT_FLOOR = 1e-3
+NEIGHBOURS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
+def _log_comb(n, k):
+    if k < 0 or k > n:
+        return math.nan
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+class BombInference:
+    # every revealed count says how many bombs sit in the 3x3 block around
+    # its cell (the cell included). Counts are kept as constraints over the
+    # cells not yet known safe or bombed. New facts are pushed through the
+    # constraints they touch; the undetermined rest is split into connected
+    # frontier components, and only components touched since the last update
+    # are solved again, exactly when small enough and approximately otherwise.
+    # The components are then tied together through the known bomb total.
+    def __init__(self, width, height, bomb_count):
+        self.reset(width, height, bomb_count)
+
+    def reset(self, width, height, bomb_count):
+        self.width = width
+        self.height = height
+        self.area = width * height
+        self.bomb_count = bomb_count
+        self.counts = {}
+        self.active = set()
+        self.safe = set()
+        self.mines = set()
+        self.probs = {}
+        self.comp_of = {}
+        self.comps = {}
+        self.next_comp = 0
+        self.background = min(1.0, bomb_count / self.area) if self.area else 0.0
+        self.pending = []
+        self.touched = set()
+        self.dirty_comps = set()
+        self.changed = False
+        self.state_bombs = None
+        self.state_head = None
+        self.state_move = 0
+
+    @classmethod
+    def for_state(cls, state):
+        engine = cls(state.width, state.height, len(state.bombs))
+        engine.sync(state)
+        return engine
+
+    def _cell(self, pos):
+        return pos[1] * self.width + pos[0]
+
+    def _around(self, cell):
+        width = self.width
+        x, y = cell % width, cell // width
+        x0, x1 = max(x - 1, 0), min(x + 2, width)
+        return [ny * width + nx for ny in range(max(y - 1, 0), min(y + 2, self.height)) for nx in range(x0, x1)]
+
+    def _known(self, cell):
+        return cell in self.safe or cell in self.mines
+
+    def _forget(self, cell):
+        self.changed = True
+        comp = self.comp_of.pop(cell, None)
+        if comp is not None:
+            self.dirty_comps.add(comp)
+        self.probs.pop(cell, None)
+        for c in self._around(cell):
+            if c in self.active:
+                self.pending.append(c)
+
+    def mark_safe(self, pos):
+        cell = self._cell(pos)
+        if not self._known(cell):
+            self.safe.add(cell)
+            self._forget(cell)
+
+    def mark_bomb(self, pos):
+        cell = self._cell(pos)
+        if not self._known(cell):
+            self.mines.add(cell)
+            self._forget(cell)
+
+    def observe(self, pos, count):
+        cell = self._cell(pos)
+        if cell in self.counts:
+            return
+        self.counts[cell] = count
+        self.changed = True
+        self.active.add(cell)
+        self.pending.append(cell)
+
+    def _unknown(self, c):
+        cells = self._around(c)
+        unknown = [u for u in cells if u not in self.safe and u not in self.mines]
+        return unknown, self.counts[c] - sum(1 for u in cells if u in self.mines)
+
+    def _propagate(self):
+        # single-constraint rules plus the subset rule against overlapping
+        # constraints: when A's unknowns lie inside B's, B minus A holds
+        # exactly the difference of their remaining bombs
+        pending = self.pending
+        while pending:
+            c = pending.pop()
+            if c not in self.active:
+                continue
+            unknown, remaining = self._unknown(c)
+            if remaining == 0 or remaining == len(unknown):
+                self.active.discard(c)
+                mark = self.mark_safe if remaining == 0 else self.mark_bomb
+                for u in unknown:
+                    mark((u % self.width, u // self.width))
+                continue
+            self.touched.add(c)
+            own = set(unknown)
+            overlapping = {d for u in unknown for d in self._around(u) if d != c and d in self.active}
+            for d in overlapping:
+                other, other_remaining = self._unknown(d)
+                if len(other) == len(own) or not own.issubset(other):
+                    continue
+                rest = [v for v in other if v not in own]
+                extra = other_remaining - remaining
+                if extra == 0 or extra == len(rest):
+                    mark = self.mark_safe if extra == 0 else self.mark_bomb
+                    for v in rest:
+                        mark((v % self.width, v // self.width))
+
+    def _components(self, seeds):
+        # flood over constraints that share unknown cells; touching an old
+        # component pulls all of its constraints in, since it may have split
+        seen = set()
+        comps = []
+        for seed in seeds:
+            if seed in seen or seed not in self.active:
+                continue
+            seen.add(seed)
+            stack = [seed]
+            constraints = []
+            cells = {}
+            while stack:
+                c = stack.pop()
+                constraints.append(c)
+                unknown, _ = self._unknown(c)
+                for u in unknown:
+                    if u in cells:
+                        continue
+                    cells[u] = len(cells)
+                    old = self.comp_of.get(u)
+                    if old is not None and old in self.comps:
+                        data = self.comps.pop(old)
+                        self._drop(data)
+                        for d in data[1]:
+                            if d not in seen and d in self.active:
+                                seen.add(d)
+                                stack.append(d)
+                    for d in self._around(u):
+                        if d not in seen and d in self.active:
+                            seen.add(d)
+                            stack.append(d)
+            comps.append((list(cells), constraints))
+        return comps
+
+    def _enumerate(self, cells, constraints):
+        # backtracking over the component's cells with int bitmasks; returns
+        # per bomb total m the number of solutions and per-cell bomb tallies,
+        # or None when the search outgrows its budget
+        index = {u: i for i, u in enumerate(cells)}
+        masks = []
+        by_cell = [[] for _ in cells]
+        for c in constraints:
+            unknown, remaining = self._unknown(c)
+            mask = 0
+            for u in unknown:
+                mask |= 1 << index[u]
+            for u in unknown:
+                by_cell[index[u]].append(len(masks))
+            masks.append((mask, remaining))
+        k = len(cells)
+        solutions = {}
+        tallies = {}
+        nodes = [0]
+
+        def consistent(i, assigned, bombs):
+            for j in by_cell[i]:
+                mask, remaining = masks[j]
+                placed = (bombs & mask).bit_count()
+                if placed > remaining or placed + (mask & ~assigned).bit_count() < remaining:
+                    return False
+            return True
+
+        def search(i, assigned, bombs):
+            nodes[0] += 1
+            if nodes[0] > ENUM_BUDGET:
+                return
+            if i == k:
+                m = bombs.bit_count()
+                solutions[m] = solutions.get(m, 0) + 1
+                row = tallies.setdefault(m, [0] * k)
+                for j in range(k):
+                    if bombs >> j & 1:
+                        row[j] += 1
+                return
+            assigned |= 1 << i
+            for option in (bombs, bombs | 1 << i):
+                if consistent(i, assigned, option):
+                    search(i + 1, assigned, option)
+
+        search(0, 0, 0)
+        if nodes[0] > ENUM_BUDGET or not solutions:
+            return None
+        return solutions, tallies
+
+    def _solve(self, cells, constraints, density):
+        # a component is kept as its weight per bomb total m (from `low`
+        # up) and, per m, how often each cell holds a bomb
+        result = self._enumerate(cells, constraints) if len(cells) <= ENUM_LIMIT else None
+        if result is None:
+            probs = self._fit(cells, constraints, density)
+            weights = np.ones(1)
+            for p in probs:
+                weights = np.convolve(weights, [1.0 - p, p])
+            return 0, weights, np.outer(weights, probs)
+        solutions, tallies = result
+        low = min(solutions)
+        weights = np.zeros(max(solutions) - low + 1)
+        hits = np.zeros((len(weights), len(cells)))
+        for m, count in solutions.items():
+            weights[m - low] = count
+            hits[m - low] = tallies[m]
+        return low, weights, hits
+
+    def _fit(self, cells, constraints, density):
+        # too large to enumerate: start from the background density and
+        # rescale each constraint's cells in turn to match its remaining
+        # count. The result is kept off 0 and 1, as it proves nothing.
+        index = {u: i for i, u in enumerate(cells)}
+        probs = np.full(len(cells), min(max(density, FIT_FLOOR), 1.0 - FIT_FLOOR))
+        rows = []
+        for c in constraints:
+            unknown, remaining = self._unknown(c)
+            rows.append(([index[u] for u in unknown], remaining))
+        for _ in range(FIT_ROUNDS):
+            for members, remaining in rows:
+                probs[members] *= remaining / probs[members].sum()
+                np.clip(probs, FIT_FLOOR, 1.0 - FIT_FLOOR, out=probs)
+        return probs
+
+    def _combine(self):
+        # the components only interact through the bomb total: the weight of
+        # a split is the product of the components' weights for their m and
+        # C(outside, bombs left - sum of m) for the unconstrained cells. Each
+        # component's marginals come from the convolution of all the others.
+        comps = list(self.comps.values())
+        bombs_left = self.bomb_count - len(self.mines)
+        outside = self.area - len(self.safe) - len(self.mines) - sum(len(c[0]) for c in comps)
+        prefix = [np.ones(1)]
+        for comp in comps:
+            total = np.convolve(prefix[-1], comp[3])
+            prefix.append(total / total.max())
+        suffix = [np.ones(1)]
+        for comp in reversed(comps):
+            total = np.convolve(suffix[-1], comp[3])
+            suffix.append(total / total.max())
+        suffix.reverse()
+        first = sum(comp[2] for comp in comps)
+        logs = np.array([_log_comb(outside, bombs_left - first - j) for j in range(len(prefix[-1]))], dtype=float)
+        if np.isnan(logs).all():
+            # the counts contradict the bomb total; fall back to local odds
+            ways = np.ones(len(logs))
+        else:
+            logs = np.nan_to_num(logs, nan=-np.inf)
+            ways = np.exp(logs - logs.max())
+        for i, (cells, _, low, weights, hits) in enumerate(comps):
+            rest = np.convolve(prefix[i], suffix[i + 1])
+            around = np.array([rest @ ways[j:j + len(rest)] for j in range(len(weights))])
+            norm = around @ weights
+            if norm <= 0:
+                around = np.ones(len(weights))
+                norm = around @ weights
+            for u, p in zip(cells, around @ hits / norm):
+                self.probs[u] = float(p)
+        totals = prefix[-1] * ways
+        if outside > 0 and totals.sum() > 0:
+            expected = totals @ (bombs_left - first - np.arange(len(totals))) / totals.sum()
+            self.background = min(1.0, max(0.0, float(expected) / outside))
+        else:
+            self.background = 0.0
+
+    def update(self):
+        # returns whether any probability may have moved since the last call
+        self._propagate()
+        if not self.changed:
+            return False
+        self.changed = False
+        seeds = set(c for c in self.touched if c in self.active)
+        for comp in self.dirty_comps:
+            if comp in self.comps:
+                seeds.update(c for c in self.comps[comp][1] if c in self.active)
+        for comp in list(self.dirty_comps):
+            data = self.comps.pop(comp, None)
+            if data is not None:
+                self._drop(data)
+        self.dirty_comps.clear()
+        self.touched.clear()
+        found = self._components(seeds)
+        unknown = self.area - len(self.safe) - len(self.mines)
+        density = (self.bomb_count - len(self.mines)) / unknown if unknown else 0.0
+        for cells, constraints in found:
+            comp = self.next_comp
+            self.next_comp += 1
+            self.comps[comp] = (cells, constraints) + self._solve(cells, constraints, density)
+            for u in cells:
+                self.comp_of[u] = comp
+        self._combine()
+        return True
+
+    def _drop(self, data):
+        for u in data[0]:
+            self.probs.pop(u, None)
+            self.comp_of.pop(u, None)
+
+    def sync(self, state):
+        # feed what the player can see after a move: the cells the snake has
+        # been on and the food are safe, the counts next to the head are
+        # revealed, and trial mode shows every bomb. Moves made since the last
+        # sync are read back from the history, so the engine can be left idle
+        # and caught up later.
+        if state.bombs is not self.state_bombs:
+            self.reset(state.width, state.height, len(state.bombs))
+            self.state_bombs = state.bombs
+            for pos in state.snake:
+                self.mark_safe(pos)
+            if state.trial:
+                for pos in state.bombs:
+                    self.mark_bomb(pos)
+        head = state.snake.head_coordinates()
+        if head == self.state_head and state.move_count == self.state_move:
+            return self.update()
+        self.state_head = head
+        for move in range(max(self.state_move, state.history_base) + 1, state.move_count):
+            cell = state.history[(move - 1 - state.history_base) * RECORD_SIZE]
+            self._reveal(state, (cell % self.width, cell // self.width), ())
+        self.state_move = state.move_count
+        for pos in state.food_set:
+            self.mark_safe(pos)
+        self._reveal(state, head, state.food_set)
+        return self.update()
+
+    def _reveal(self, state, head, food):
+        self.mark_safe(head)
+        head_x, head_y = head
+        for dx, dy in NEIGHBOURS:
+            x, y = head_x + dx, head_y + dy
+            if 0 <= x < self.width and 0 <= y < self.height and (x, y) not in food and not state.snake.contains((x, y)):
+                self.observe((x, y), count_adjacent_bombs(x, y, state.bombs))
+
+    def probability(self, pos):
+        cell = self._cell(pos)
+        if cell in self.safe:
+            return 0.0
+        if cell in self.mines:
+            return 1.0
+        return self.probs.get(cell, self.background)
+
+def benchmark(width, height, bomb_count, moves, seed=0):
+    from autopilot import Autopilot
+    state = GameState(3, bomb_count, width=width, height=height, seed=seed, max_undos=None)
+    engine = BombInference.for_state(state)
+    pilot = Autopilot(state, inference=engine)
+    worst = 0.0
+    start = time.perf_counter()
+    done = 0
+    for done in range(1, moves + 1):
+        if pilot.step() not in (MOVED, ATE):
+            break
+        t = time.perf_counter()
+        engine.sync(state)
+        worst = max(worst, time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    return done, elapsed, worst, state
+
+def main(argv):
+    width = int(argv[1]) if len(argv) > 1 else 200
+    height = int(argv[2]) if len(argv) > 2 else width
+    bomb_count = int(argv[3]) if len(argv) > 3 else width * height // 10
+    done, elapsed, worst, state = benchmark(width, height, bomb_count, 5000)
+    print(f"{done} moves on {width}x{height} with {bomb_count} bombs in {elapsed:.2f}s, "
+          f"slowest update {worst * 1000:.2f} ms, outcome {state.outcome}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
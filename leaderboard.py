@@ -0,0 +1,371 @@
+import heapq
+import itertools
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+READ_CHUNK = 1 << 20
+MAX_REPORTED_ERRORS = 20
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+class Leaderboard:
+    def __init__(self, entries=(), capacity=10):
+        self.capacity = capacity
+        self.count = 0
+        self._heap = []
+        self._top = None
+        self.errors = []
+        self.error_count = 0
+        for name, score in entries:
+            self.add(name, score)
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+        self._heap = []
+        self._top = None
+        self.errors = []
+        self.error_count = 0
+
+    def add(self, name, score):
+        # min-heap keyed on (score, -seq): on ties the newest entry is evicted first
+        item = (score, -self.count, name)
+        self.count += 1
+        if len(self._heap) < self.capacity:
+            heapq.heappush(self._heap, item)
+        elif item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+        else:
+            return
+        self._top = None
+
+    def top(self, count=None):
+        if self._top is None:
+            self._top = [[name, score] for score, _, name in sorted(self._heap, reverse=True)]
+        if count is None:
+            return self._top
+        return self._top[:count]
+
+    def add_error(self, lineno, line):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((lineno, line))
+
+def _lock(fd, exclusive):
+    # advisory lock, released when fd is closed
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+def parse_line(line):
+    if ':' not in line:
+        raise ValueError("missing ':' separator")
+    name_part, score_part = line.split(':', 1)
+    return name_part.strip(), int(score_part.strip())
+
+def iter_entries(file_path, on_error=None):
+    try:
+        # decoded the same way as refresh(), so a stray byte spoils one line
+        # rather than the whole stream
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as fh:
+            lineno = 0
+            while True:
+                lines = fh.readlines(READ_CHUNK)
+                if not lines:
+                    break
+                for line in lines:
+                    lineno += 1
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield parse_line(line)
+                    except ValueError:
+                        if on_error is not None:
+                            on_error(lineno, line)
+    except FileNotFoundError:
+        return
+
+def load_leaderboard(file_path, capacity=10):
+    board = Leaderboard(capacity=capacity)
+    for name, score in iter_entries(file_path, board.add_error):
+        board.add(name, score)
+    return board
+
+class TextScoreStore:
+    def __init__(self, file_path, batch_size=32, max_delay=0.5):
+        self.path = file_path
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.pending = []
+        self.pending_since = None
+        self.offset = 0
+        self.lineno = 0
+        self.seen = None
+
+    def add(self, name, score):
+        if not self.pending:
+            self.pending_since = time.monotonic()
+        self.pending.append(f"{name}:{score}\n")
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        data = ''.join(self.pending).encode('utf-8')
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            _lock(fd, exclusive=True)
+            # a hand-edited file may end without a newline; finish that line
+            # first so the batch does not run into it
+            if os.fstat(fd).st_size:
+                os.lseek(fd, -1, os.SEEK_END)
+                if os.read(fd, 1) != b'\n':
+                    data = b'\n' + data
+            # one write per batch under the lock, so readers never see half a batch
+            while data:
+                written = os.write(fd, data)
+                data = data[written:]
+        finally:
+            os.close(fd)
+        self.pending = []
+        self.pending_since = None
+
+    def load(self, capacity=10):
+        self.flush()
+        board = Leaderboard(capacity=capacity)
+        self.offset = 0
+        self.lineno = 0
+        self.seen = None
+        self.refresh(board)
+        return board
+
+    def refresh(self, board):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp == self.seen:
+            return False
+        if st.st_size < self.offset or (self.seen and self.seen[0] != st.st_ino):
+            # truncated or replaced: start over
+            board.clear()
+            self.offset = 0
+            self.lineno = 0
+        with open(self.path, 'rb') as fh:
+            _lock(fh.fileno(), exclusive=False)
+            fh.seek(self.offset)
+            while True:
+                lines = fh.readlines(READ_CHUNK)
+                if not lines:
+                    break
+                for raw in lines:
+                    if not raw.endswith(b'\n'):
+                        break
+                    self.offset += len(raw)
+                    self.lineno += 1
+                    line = raw.decode('utf-8', 'replace').strip()
+                    if not line:
+                        continue
+                    try:
+                        name, score = parse_line(line)
+                    except ValueError:
+                        board.add_error(self.lineno, line)
+                        continue
+                    board.add(name, score)
+        self.seen = stamp
+        return True
+
+    def sync(self, board):
+        if self.pending and time.monotonic() - self.pending_since >= self.max_delay:
+            self.flush()
+        return self.refresh(board)
+
+    def top(self, k):
+        self.flush()
+        return load_leaderboard(self.path, k).top()
+
+    def __len__(self):
+        self.flush()
+        return sum(1 for _ in iter_entries(self.path))
+
+    def rank_of(self, score):
+        self.flush()
+        return 1 + sum(1 for _, s in iter_entries(self.path) if s > score)
+
+    def best_for(self, name):
+        self.flush()
+        return max((s for n, s in iter_entries(self.path) if n == name), default=None)
+
+    def page(self, offset, limit):
+        return self.top(offset + limit)[offset:]
+
+    def page_after(self, cursor, limit):
+        # same contract as SqliteScoreStore.page_after, with the line's
+        # position in the file standing in for the row id
+        self.flush()
+        entries = ((-score, seq, name) for seq, (name, score) in enumerate(iter_entries(self.path)))
+        if cursor is not None:
+            after = (-cursor[0], cursor[1])
+            entries = (entry for entry in entries if entry[:2] > after)
+        rows = heapq.nsmallest(limit, entries)
+        cursor = (-rows[-1][0], rows[-1][1]) if rows else cursor
+        return [[name, -key] for key, _, name in rows], cursor
+
+    def close(self):
+        self.flush()
+
+class SqliteScoreStore:
+    def __init__(self, db_path):
+        self.path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS scores (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                score INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC, id);
+            CREATE INDEX IF NOT EXISTS scores_by_name ON scores (name, score DESC);
+            CREATE TABLE IF NOT EXISTS score_counts (
+                score INTEGER PRIMARY KEY,
+                n INTEGER NOT NULL
+            );
+        """)
+        self.conn.commit()
+        self.last_id = 0
+
+    def add(self, name, score):
+        with self.conn:
+            self.conn.execute("INSERT INTO scores (name, score) VALUES (?, ?)", (name, score))
+            self._count_scores([(score, 1)])
+
+    def _count_scores(self, counts):
+        self.conn.executemany(
+            "INSERT INTO score_counts (score, n) VALUES (?, ?) "
+            "ON CONFLICT (score) DO UPDATE SET n = n + excluded.n",
+            counts,
+        )
+
+    def load(self, capacity=10):
+        self.last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM scores").fetchone()[0]
+        board = Leaderboard(self.top(capacity), capacity)
+        board.count = len(self)
+        return board
+
+    def sync(self, board):
+        rows = self.conn.execute(
+            "SELECT id, name, score FROM scores WHERE id > ? ORDER BY id", (self.last_id,)
+        ).fetchall()
+        for row_id, name, score in rows:
+            board.add(name, score)
+            self.last_id = row_id
+        return bool(rows)
+
+    def flush(self):
+        pass
+
+    def top(self, k):
+        return self.page(0, k)
+
+    def __len__(self):
+        return self.conn.execute("SELECT COALESCE(SUM(n), 0) FROM score_counts").fetchone()[0]
+
+    def rank_of(self, score):
+        # score_counts holds one row per distinct score, so this stays small
+        # no matter how many games have been played
+        above = self.conn.execute(
+            "SELECT COALESCE(SUM(n), 0) FROM score_counts WHERE score > ?", (score,)
+        ).fetchone()[0]
+        return above + 1
+
+    def best_for(self, name):
+        row = self.conn.execute(
+            "SELECT score FROM scores WHERE name = ? ORDER BY score DESC LIMIT 1", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def page(self, offset, limit):
+        # OFFSET walks past every skipped row; deep pages should use page_after
+        rows = self.conn.execute(
+            "SELECT name, score FROM scores ORDER BY score DESC, id LIMIT ? OFFSET ?", (limit, offset)
+        )
+        return [[name, score] for name, score in rows]
+
+    def page_after(self, cursor, limit):
+        # keyset pagination: cursor is the (score, id) of the last row of the
+        # previous page, or None for the first one. Both queries seek straight
+        # into scores_by_score, so a deep page costs the same as the first.
+        if cursor is None:
+            rows = self.conn.execute(
+                "SELECT id, name, score FROM scores ORDER BY score DESC, id LIMIT ?", (limit,)
+            ).fetchall()
+        else:
+            score, row_id = cursor
+            rows = self.conn.execute(
+                "SELECT id, name, score FROM scores WHERE score = ? AND id > ? ORDER BY id LIMIT ?",
+                (score, row_id, limit),
+            ).fetchall()
+            if len(rows) < limit:
+                rows += self.conn.execute(
+                    "SELECT id, name, score FROM scores WHERE score < ? ORDER BY score DESC, id LIMIT ?",
+                    (score, limit - len(rows)),
+                ).fetchall()
+        cursor = (rows[-1][2], rows[-1][0]) if rows else cursor
+        return [[name, score] for _, name, score in rows], cursor
+
+    def import_text(self, file_path, on_error=None, batch_size=50000):
+        imported = 0
+        entries = iter_entries(file_path, on_error)
+        with self.conn:
+            while True:
+                batch = list(itertools.islice(entries, batch_size))
+                if not batch:
+                    break
+                self.conn.executemany("INSERT INTO scores (name, score) VALUES (?, ?)", batch)
+                self._count_scores(Counter(score for _, score in batch).items())
+                imported += len(batch)
+        return imported
+
+    def close(self):
+        self.conn.close()
+
+def open_store(path):
+    if os.path.splitext(path)[1] in SQLITE_SUFFIXES:
+        return SqliteScoreStore(path)
+    return TextScoreStore(path)
+
+def print_parse_errors(board, file_path):
+    for lineno, line in board.errors:
+        print(f"{file_path}:{lineno}: skipped malformed entry {line!r}")
+    hidden = board.error_count - len(board.errors)
+    if hidden > 0:
+        print(f"{file_path}: {hidden} more malformed entries skipped")
+
+def main(argv):
+    if len(argv) != 3:
+        print("usage: python leaderboard.py <leaderboard.txt> <scores.db>")
+        return 2
+    text_path, db_path = argv[1], argv[2]
+    board = Leaderboard(capacity=0)
+    store = SqliteScoreStore(db_path)
+    imported = store.import_text(text_path, board.add_error)
+    store.close()
+    print_parse_errors(board, text_path)
+    print(f"Imported {imported} scores from {text_path} into {db_path}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -1,6 +1,5 @@
-from terminal import run_game
-from graphicals import GameGUI
 from validation import ask_choice, ask_yes_no, ask_int
+from gamelogic import BOARD_WIDTH, BOARD_HEIGHT, MAX_BOARD_SIZE
 import os
 
 def main():
@@ -18,7 +17,8 @@ def main():
         " - Game over if you hit a wall, your own body, or a bomb.\n"
         " - Enable trial mode to see bomb positions for practice.\n"
         " - Scores are saved to the leaderboard after each round.\n"
-        " - Navigate using W/A/S/D or arrow keys, Q to quit and Z to undo.\n"
+        " - Navigate using W/A/S/D or arrow keys, Q to quit, Z to undo and Y to redo.\n"
+        " - In the GUI, P hands the snake to the autopilot and back, and H shows the bomb odds worked out from the counts seen so far.\n"
     )
 
     print(welcome)
@@ -30,7 +30,9 @@ def main():
 
     if mode_choice == '2':
         print("\nStarting GUI mode...")
-        game = GameGUI(food_count=3, bomb_count=7, trial=trial)
+        from graphicals import GameGUI
+        game = GameGUI(food_count=3, bomb_count=7, trial=trial, profile_file=os.environ.get('SNAKE_PROFILE'),
+                       replay_dir=os.environ.get('SNAKE_REPLAYS'))
         final_score = game.run()
         print(f"\nFinal score: {final_score}\n")
 
@@ -39,13 +41,19 @@ def main():
             print("\nDifficulty settings — leave blank to use the default shown in [brackets].")
             food_count = ask_int("How many food items?", default=3, min_value=1, max_value=100)
             bomb_count = ask_int("How many bombs?", default=7, min_value=0, max_value=200)
+            width = ask_int("Board width?", default=BOARD_WIDTH, min_value=3, max_value=MAX_BOARD_SIZE)
+            height = ask_int("Board height?", default=BOARD_HEIGHT, min_value=3, max_value=MAX_BOARD_SIZE)
         else:
             print("Practice mode: bombs will be visible during play.")
             food_count = 3
             bomb_count = 7
+            width = BOARD_WIDTH
+            height = BOARD_HEIGHT
         
         print("\nStarting CLI mode...")
-        run_game(food_count=food_count, bomb_count=bomb_count, trial=trial)
+        from terminal import run_game
+        run_game(food_count=food_count, bomb_count=bomb_count, trial=trial, width=width, height=height,
+                 replay_dir=os.environ.get('SNAKE_REPLAYS'))
   
 if __name__ == '__main__':
     main()
\ No newline at end of file
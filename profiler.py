@@ -0,0 +1,115 @@
+import json
+import time
+from array import array
+
+PHASES = ('events', 'draw_header', 'draw_board', 'draw_sidebar', 'overlays', 'present', 'frame')
+
+class RingBuffer:
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.values = array('d', bytes(8 * capacity))
+        self.count = 0
+
+    def append(self, value):
+        self.values[self.count % self.capacity] = value
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def samples(self):
+        return self.values[:len(self)]
+
+    def percentiles(self, points=(50, 95, 99)):
+        ordered = sorted(self.samples())
+        if not ordered:
+            return {p: 0.0 for p in points}
+        last = len(ordered) - 1
+        return {p: ordered[round(last * p / 100)] for p in points}
+
+class PhaseTimer:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.pending[self.name] += time.perf_counter() - self.start
+        return False
+
+class NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = NullTimer()
+
+class FrameProfiler:
+    def __init__(self, enabled=False, capacity=600):
+        self.enabled = enabled
+        self.buffers = {name: RingBuffer(capacity) for name in PHASES}
+        self.timers = {name: PhaseTimer(self, name) for name in PHASES}
+        self.frame_times = RingBuffer(capacity)
+        self.pending = dict.fromkeys(PHASES, 0.0)
+        self.frame_start = 0.0
+
+    def phase(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+        return self.timers[name]
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_start = time.perf_counter()
+
+    def lap(self, name):
+        if self.enabled:
+            self.pending[name] += time.perf_counter() - self.frame_start
+
+    def end_frame(self):
+        # phases are accumulated while the frame runs, so a phase hit several
+        # times in one frame (e.g. draw_board per dirty cell) is summed
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.pending['frame'] = now - self.frame_start
+        for name, elapsed in self.pending.items():
+            self.buffers[name].append(elapsed * 1000.0)
+            self.pending[name] = 0.0
+        self.frame_times.append(now)
+
+    def fps(self, window=1.0):
+        times = self.frame_times.samples()
+        if not times:
+            return 0.0
+        newest = max(times)
+        return float(sum(1 for t in times if newest - t < window))
+
+    def stats(self):
+        result = {}
+        for name in PHASES:
+            points = self.buffers[name].percentiles()
+            result[name] = {f'p{p}': round(value, 3) for p, value in points.items()}
+        return result
+
+    def summary_lines(self):
+        lines = [f"FPS {self.fps():.0f}   ms p50/p95/p99"]
+        for name, points in self.stats().items():
+            lines.append(f"{name:<13}{points['p50']:6.2f}{points['p95']:7.2f}{points['p99']:7.2f}")
+        return lines
+
+    def dump(self, file_path):
+        report = {
+            'frames': self.buffers['frame'].count,
+            'fps': self.fps(),
+            'phases_ms': self.stats(),
+        }
+        with open(file_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Frame profile written to {file_path}")
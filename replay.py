@@ -0,0 +1,223 @@
+import bisect
+import os
+import struct
+import sys
+import time
+import numpy as np
+from gamelogic import GameState, print_board, RECORD_SIZE, MOVED, ATE
+
+# file layout: a fixed header with the seed and settings, then append-only
+# chunks. MOVES chunks hold the input stream at 3 bits per event, KEYFRAME
+# chunks hold a packed state so playback can start close to any position.
+MAGIC = b'SSRP'
+VERSION = 3
+HEADER = struct.Struct('<4sBQHHHHHBQ')
+CHUNK = struct.Struct('<BI')
+KEYFRAME_INDEX = struct.Struct('<Q')
+MOVES = 1
+KEYFRAME = 2
+TRIAL_FLAG = 1
+NO_UNDO_LIMIT = 0xFFFF
+
+KEYFRAME_INTERVAL = 1024
+KEYFRAME_HISTORY = 256
+CHUNK_EVENTS = 256
+
+# event codes; PAD fills out the last 8-event group and is skipped on read
+UP, DOWN, LEFT, RIGHT, UNDO, REDO, RESET, PAD = range(8)
+DIRECTION_CODES = {(0, -1): UP, (0, 1): DOWN, (-1, 0): LEFT, (1, 0): RIGHT}
+CODE_DIRECTIONS = {code: direction for direction, code in DIRECTION_CODES.items()}
+SHIFTS = np.arange(0, 24, 3, dtype=np.uint32)
+
+def pack_events(codes):
+    codes = np.asarray(codes, dtype=np.uint32)
+    codes = np.concatenate([codes, np.full(-len(codes) % 8, PAD, dtype=np.uint32)])
+    words = (codes.reshape(-1, 8) << SHIFTS).sum(axis=1, dtype=np.uint32)
+    return words.astype('<u4').view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+
+def unpack_events(data):
+    groups = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.uint32)
+    words = groups[:, 0] | (groups[:, 1] << 8) | (groups[:, 2] << 16)
+    codes = ((words[:, None] >> SHIFTS) & 7).astype(np.uint8).ravel()
+    return codes[codes != PAD]
+
+class ReplayRecorder:
+    def __init__(self, file_path, state, keyframe_interval=KEYFRAME_INTERVAL):
+        if not 0 <= state.seed < 1 << 64:
+            raise ValueError("replays need a seed in [0, 2**64)")
+        self.path = file_path
+        self.state = state
+        self.keyframe_interval = keyframe_interval
+        self.pending = []
+        self.count = 0
+        # the file is only created with the first event, so a game that is
+        # replaced before anything happens leaves no empty replay behind
+        self.file = None
+        flags = TRIAL_FLAG if state.trial else 0
+        max_undos = NO_UNDO_LIMIT if state.max_undos is None else state.max_undos
+        self.header = HEADER.pack(MAGIC, VERSION, state.seed, state.width, state.height,
+                                  state.food_count, state.bomb_count, max_undos, flags, state.history_budget)
+        state.recorder = self
+
+    def record_step(self, direction):
+        self.record(DIRECTION_CODES[direction])
+
+    def record_undo(self):
+        self.record(UNDO)
+
+    def record_redo(self):
+        self.record(REDO)
+
+    def record_reset(self):
+        self.record(RESET)
+
+    def record(self, code):
+        # called before the event is applied, so a keyframe taken here is the
+        # state after exactly `count` events
+        if self.file is None:
+            self.file = open(self.path, 'wb')
+            self.file.write(self.header)
+        if self.count and self.count % self.keyframe_interval == 0:
+            self.flush()
+            self.write_chunk(KEYFRAME, KEYFRAME_INDEX.pack(self.count) + self.state.snapshot(history_window=KEYFRAME_HISTORY))
+        self.pending.append(code)
+        self.count += 1
+        if len(self.pending) >= CHUNK_EVENTS:
+            self.flush()
+
+    def write_chunk(self, kind, payload):
+        self.file.write(CHUNK.pack(kind, len(payload)))
+        self.file.write(payload)
+
+    def flush(self):
+        if self.file is None:
+            return
+        if self.pending:
+            self.write_chunk(MOVES, pack_events(self.pending))
+            self.pending = []
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            if self.file.closed:
+                return
+            self.flush()
+            self.file.close()
+        if self.state.recorder is self:
+            self.state.recorder = None
+
+def new_replay_path(directory, state):
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{state.seed:016x}.ssr")
+
+class Replay:
+    def __init__(self, settings, events, keyframes):
+        self.settings = settings
+        self.events = events
+        self.keyframes = keyframes
+        self.keyframe_index = [index for index, _ in keyframes]
+
+    @classmethod
+    def load(cls, file_path):
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ValueError(f"{file_path}: not a replay file")
+        (magic, version, seed, width, height, food_count, bomb_count, max_undos, flags,
+         history_budget) = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{file_path}: not a replay file")
+        settings = {
+            'food_count': food_count, 'bomb_count': bomb_count, 'trial': bool(flags & TRIAL_FLAG),
+            'max_undos': None if max_undos == NO_UNDO_LIMIT else max_undos,
+            'width': width, 'height': height, 'seed': seed, 'history_budget': history_budget,
+        }
+        parts = []
+        keyframes = []
+        total = 0
+        offset = HEADER.size
+        # a truncated trailing chunk (e.g. after a crash) is ignored
+        while offset + CHUNK.size <= len(data):
+            kind, length = CHUNK.unpack_from(data, offset)
+            offset += CHUNK.size
+            if offset + length > len(data):
+                break
+            payload = data[offset:offset + length]
+            offset += length
+            if kind == MOVES:
+                codes = unpack_events(payload)
+                parts.append(codes)
+                total += len(codes)
+            elif kind == KEYFRAME:
+                index, = KEYFRAME_INDEX.unpack_from(payload)
+                if index <= total:
+                    keyframes.append((index, payload[KEYFRAME_INDEX.size:]))
+        events = np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint8)
+        return cls(settings, events, keyframes)
+
+    def __len__(self):
+        return len(self.events)
+
+    def new_state(self):
+        return GameState(**self.settings)
+
+    def state_at(self, index=None):
+        if index is None or index > len(self.events):
+            index = len(self.events)
+        k = bisect.bisect_right(self.keyframe_index, index) - 1
+        # keyframes carry only a window of the undo history, so events that
+        # walk out of it are replayed from an earlier keyframe instead
+        while k >= 0:
+            start, blob = self.keyframes[k]
+            state = GameState.restore(blob)
+            if play_events(state, self.events[start:index].tolist()):
+                return state
+            k -= 1
+        state = self.new_state()
+        play_events(state, self.events[:index].tolist())
+        return state
+
+def play_events(state, codes):
+    # returns False as soon as an undo or redo needs a move the state was
+    # restored without; a window shorter than KEYFRAME_HISTORY is complete
+    end = state.history_base + len(state.history) // RECORD_SIZE
+    floor = state.history_base if state.history_pos >= KEYFRAME_HISTORY else None
+    ceiling = end if end - state.move_count >= KEYFRAME_HISTORY else None
+    for code in codes:
+        if code == UNDO and state.move_count == floor and state.remaining_undos != 0:
+            return False
+        if code == REDO and state.move_count == ceiling:
+            return False
+        if code == RESET:
+            floor = ceiling = None
+        if apply_event(state, code) in (MOVED, ATE):
+            ceiling = None
+    return True
+
+def apply_event(state, code):
+    if code == UNDO:
+        return state.undo()
+    if code == REDO:
+        return state.redo()
+    if code == RESET:
+        return state.reset()
+    return state.step(CODE_DIRECTIONS[code])
+
+def main(argv):
+    if len(argv) not in (2, 3):
+        print("usage: python replay.py <replay.ssr> [event index]")
+        return 2
+    replay = Replay.load(argv[1])
+    index = int(argv[2]) if len(argv) == 3 else None
+    state = replay.state_at(index)
+    settings = replay.settings
+    print(f"seed {settings['seed']}  board {settings['width']}x{settings['height']}  "
+          f"food {settings['food_count']}  bombs {settings['bomb_count']}  trial {settings['trial']}")
+    print(f"{len(replay)} events, {len(replay.keyframes)} keyframes")
+    board = [[' '] * state.width for _ in range(state.height)]
+    print_board(board, state.snake, state.food_set, state.bombs, True)
+    print(f"Score: {state.score}  length: {state.snake.length}  outcome: {state.outcome}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -1,121 +1,202 @@
-from gamelogic import Snake, generate_food, generate_bombs,print_board, heapSort, BOARD_WIDTH, BOARD_HEIGHT, random_free_position
+from gamelogic import GameState, count_adjacent_bombs, BOARD_WIDTH, BOARD_HEIGHT, MAX_BOARD_SIZE, HIT_WALL, HIT_SELF, HIT_BOMB, MAX_UNDOS, NO_UNDOS_LEFT, NOTHING_TO_UNDO, NOTHING_TO_REDO
 from validation import ask_yes_no, ask_int
+from leaderboard import open_store, print_parse_errors
+from replay import ReplayRecorder, new_replay_path
 
 import os
 import random
+import sys
 from readchar import readkey
 from readchar.key import UP, DOWN, LEFT, RIGHT
+from wcwidth import wcswidth
 
-def _game_loop(food_count=3, bomb_count=5, trial=False):
-    snake = Snake()
-    snake.add_head(BOARD_WIDTH // 2, BOARD_HEIGHT // 2)
-    score = 0
-
-    temp_empty_bombs = set()
-    food_set = generate_food(snake, temp_empty_bombs, food_count)
-    bombs = generate_bombs(snake, food_set, bomb_count)
-
-    board = [[' '] * BOARD_WIDTH for _ in range(BOARD_HEIGHT)]
-
-    print("Initial Board:")
-    print_board(board, snake, food_set, bombs, trial)
-
-    undo_stack = []
-    MAX_UNDOS = 3
-    remaining_undos = MAX_UNDOS
-
-    def _do_move(dx, dy):
-        nonlocal score
-        head_x, head_y = snake.head.x, snake.head.y
-        new_x, new_y = head_x + dx, head_y + dy
-
-        if (
-            new_x < 0
-            or new_x >= BOARD_WIDTH
-            or new_y < 0
-            or new_y >= BOARD_HEIGHT
-            or (new_x, new_y) in snake.positions
-        ):
-            print(
-                f"💀 Game Over! You crashed into a wall or yourself. {('Final Score: ' + str(score)) if not trial else 'Have fun playing the real game!'}"
-            )
-            return False
-
-        if (new_x, new_y) in bombs:
-            print(
-                f"💥 BOOM! You hit a bomb. Game Over! {('Final Score: ' + str(score)) if not trial else 'Have fun playing the real game!'}"
-            )
-            return False
-
-        snake.add_head(new_x, new_y)
-        removed_tail = None
-        ate = False
-        eaten_pos = None
-        respawned_food = None
-
-        if (new_x, new_y) in food_set:
-            ate = True
-            eaten_pos = (new_x, new_y)
-            food_set.discard(eaten_pos)         
-            if not trial:
-                score += 10
-            pos = random_free_position(snake.positions, food_set, bombs, BOARD_WIDTH, BOARD_HEIGHT)
-            if pos is not None:
-                food_set.add(pos)
-                respawned_food = pos
-            else:
-                respawned_food = None
+CELL_STYLES = {'wide': 6, 'compact': 2}
+
+class TerminalRenderer:
+    # keeps the last frame on screen and rewrites only the cells that changed,
+    # using ANSI cursor moves batched into a single write per frame. Only a
+    # window around the head that fits the terminal is ever formatted.
+    def __init__(self, width, height, trial=False, out=None, style=None):
+        self.width = width
+        self.height = height
+        self.trial = trial
+        self.out = out or sys.stdout
+        self.style = style
+        self.pads = {}
+        self.frame = None
+        self.layout = None
+        if os.name == 'nt':
+            os.system('')
+
+    def terminal_size(self):
+        try:
+            return os.get_terminal_size(self.out.fileno())
+        except (AttributeError, ValueError, OSError):
+            return os.terminal_size((80, 24))
+
+    def fit(self, style, columns, lines):
+        cell_w = CELL_STYLES[style]
+        if style == 'wide':
+            cols = (columns - 1) // (cell_w + 1)
+            rows = (lines - 3) // 2
         else:
-            removed_tail = snake.remove_tail()
-
-        move_info = {
-            'head': (new_x, new_y),
-            'removed_tail': removed_tail,
-            'ate': ate,
-            'eaten_pos': eaten_pos,
-            'respawned_food': respawned_food,
-        }
-        undo_stack.append(('move', move_info))
-        return True
+            cols = (columns - 2) // cell_w
+            rows = lines - 4
+        return max(1, min(self.width, cols)), max(1, min(self.height, rows))
+
+    def choose_layout(self):
+        columns, lines = self.terminal_size()
+        style = self.style
+        if style is None:
+            # wide cells while the whole board fits, compact once it does not
+            style = 'wide' if self.fit('wide', columns, lines) == (self.width, self.height) else 'compact'
+        return (style,) + self.fit(style, columns, lines)
+
+    def view_origin(self, head):
+        _, cols, rows = self.layout
+        view_x = max(0, min(head[0] - cols // 2, self.width - cols))
+        view_y = max(0, min(head[1] - rows // 2, self.height - rows))
+        return view_x, view_y
+
+    def pad(self, glyph):
+        padded = self.pads.get(glyph)
+        if padded is None:
+            cell_w = CELL_STYLES[self.layout[0]]
+            width = wcswidth(glyph)
+            pad_left = (cell_w - width) // 2
+            padded = " " * pad_left + glyph + " " * (cell_w - width - pad_left)
+            self.pads[glyph] = padded
+        return padded
+
+    def glyphs(self, state, view):
+        _, cols, rows = self.layout
+        empty = ' ' if self.layout[0] == 'wide' else '·'
+        view_x, view_y = view
+        snake_cells = state.snake.positions
+        head = state.snake.head_coordinates()
+        hints = {}
+        for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
+            pos = (head[0] + dx, head[1] + dy)
+            if 0 <= pos[0] < self.width and 0 <= pos[1] < self.height:
+                hints[pos] = str(count_adjacent_bombs(pos[0], pos[1], state.bombs))
+        frame = []
+        for y in range(view_y, view_y + rows):
+            row = []
+            for x in range(view_x, view_x + cols):
+                pos = (x, y)
+                if pos in snake_cells:
+                    glyph = '🐍' if pos == head else '🟩'
+                elif pos in state.food_set:
+                    glyph = '🍎'
+                elif pos in hints:
+                    glyph = hints[pos]
+                elif self.trial and pos in state.bombs:
+                    glyph = '💣'
+                else:
+                    glyph = empty
+                row.append(glyph)
+            frame.append(row)
+        return frame
+
+    def board_text(self, frame):
+        style, cols, _ = self.layout
+        if style == 'compact':
+            lines = ["╔" + "═" * (2 * cols) + "╗"]
+            lines.extend("║" + "".join(self.pad(glyph) for glyph in row) + "║" for row in frame)
+            lines.append("╚" + "═" * (2 * cols) + "╝")
+            return "\n".join(lines)
+        rule = ["═" * CELL_STYLES[style]] * cols
+        lines = ["╔" + "╦".join(rule) + "╗"]
+        for y, row in enumerate(frame):
+            lines.append("║" + "║".join(self.pad(glyph) for glyph in row) + "║")
+            if y != len(frame) - 1:
+                lines.append("╠" + "╬".join(rule) + "╣")
+        lines.append("╚" + "╩".join(rule) + "╝")
+        return "\n".join(lines)
+
+    def cell_position(self, x, y):
+        if self.layout[0] == 'compact':
+            return 2 + y, 2 + x * 2
+        return 2 + 2 * y, 2 + x * (CELL_STYLES['wide'] + 1)
+
+    def status_row(self):
+        style, _, rows = self.layout
+        return rows + 3 if style == 'compact' else 2 * rows + 2
+
+    def draw(self, state, message=""):
+        layout = self.choose_layout()
+        if layout != self.layout:
+            self.layout = layout
+            self.pads = {}
+            self.frame = None
+        _, cols, rows = layout
+        view = self.view_origin(state.snake.head_coordinates())
+        frame = self.glyphs(state, view)
+        if self.frame is None:
+            parts = ["\x1b[2J\x1b[H", self.board_text(frame)]
+        else:
+            parts = []
+            for y, (row, old) in enumerate(zip(frame, self.frame)):
+                for x, glyph in enumerate(row):
+                    if glyph != old[x]:
+                        line, column = self.cell_position(x, y)
+                        parts.append(f"\x1b[{line};{column}H{self.pad(glyph)}")
+        undos = "unlimited" if state.remaining_undos is None else state.remaining_undos
+        status = f"Score: {state.score} | Undos left: {undos}"
+        if (cols, rows) != (self.width, self.height):
+            status += f" | View {view[0]},{view[1]} of {self.width}x{self.height}"
+        parts.append(f"\x1b[{self.status_row()};1H\x1b[K{status}\n\x1b[K{message}")
+        self.out.write("".join(parts))
+        self.out.flush()
+        self.frame = frame
+
+    def close(self):
+        self.out.write(f"\x1b[{self.status_row() + 2};1H")
+        self.out.flush()
+
+def _game_loop(food_count=3, bomb_count=5, trial=False, width=BOARD_WIDTH, height=BOARD_HEIGHT, cell_style=None, seed=None, replay_dir=None,
+               max_undos=MAX_UNDOS):
+    state = GameState(food_count, bomb_count, trial=trial, max_undos=max_undos, width=width, height=height, seed=seed)
+    recorder = ReplayRecorder(new_replay_path(replay_dir, state), state) if replay_dir else None
+    try:
+        return _play(state, trial, cell_style)
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+def _play(state, trial, cell_style):
+    renderer = TerminalRenderer(state.width, state.height, trial, style=cell_style)
+    renderer.draw(state)
 
     while True:
-        print(f"Score: {score} | Undos left: {remaining_undos}")
         try:
             k = readkey()
         except KeyboardInterrupt:
-            print(f"{('You chose to quit. Final Score: ' + str(score)) if not trial else 'Have fun playing the real game!' }")
-            return score
+            renderer.close()
+            print(f"{('You chose to quit. Final Score: ' + str(state.score)) if not trial else 'Have fun playing the real game!' }")
+            return state.score
 
         if (isinstance(k, str) and k.lower() == 'q'):
-            print(f"{('You chose to quit. Final Score: ' + str(score)) if not trial else 'Have fun playing the real game!' }")
-            return score
+            renderer.close()
+            print(f"{('You chose to quit. Final Score: ' + str(state.score)) if not trial else 'Have fun playing the real game!' }")
+            return state.score
 
+        message = ""
         if (isinstance(k, str) and k.lower() == 'z'):
-            if remaining_undos <= 0:
-                print("Oops! No more undos left.")
-                continue
-            if not undo_stack:
-                print("Nothing to undo yet.")
-                continue
-            kind, info = undo_stack.pop()
-            if kind != 'move':
-                print("Undo error occurred.")
-            removed_head = snake.remove_head()
-            if info.get('ate'):
-                if not trial:
-                    score -= 10
-                eaten_pos = info.get('eaten_pos')
-                respawned = info.get('respawned_food')
-                if respawned is not None:
-                    food_set.discard(respawned)
-                if eaten_pos is not None:
-                    food_set.add(eaten_pos)
+            result = state.undo()
+            if result == NO_UNDOS_LEFT:
+                message = "Oops! No more undos left."
+            elif result == NOTHING_TO_UNDO:
+                message = "Nothing to undo yet."
+            elif state.remaining_undos is None:
+                message = "Move undone."
             else:
-                removed_tail = info.get('removed_tail')
-                if removed_tail is not None:
-                    snake.append_tail(removed_tail)
-            remaining_undos -= 1
-            print(f"Undos remaining: {remaining_undos}")
+                message = f"Undos remaining: {state.remaining_undos}"
+        elif (isinstance(k, str) and k.lower() == 'y'):
+            if state.redo() == NOTHING_TO_REDO:
+                message = "Nothing to redo."
+            else:
+                message = "Move redone."
 
         mapping = {
             UP: (0, -1),
@@ -128,57 +209,54 @@ def _game_loop(food_count=3, bomb_count=5, trial=False):
             'd': (1, 0),
         }
         if k in mapping:
-            dx, dy = mapping[k]
-            cont = _do_move(dx, dy)
-            if not cont:
-                return score if not trial else -1
+            outcome = state.step(mapping[k])
+            if outcome in (HIT_WALL, HIT_SELF, HIT_BOMB):
+                renderer.draw(state)
+                renderer.close()
+            if outcome in (HIT_WALL, HIT_SELF):
+                print(
+                    f"💀 Game Over! You crashed into a wall or yourself. {('Final Score: ' + str(state.score)) if not trial else 'Have fun playing the real game!'}"
+                )
+                return state.score if not trial else -1
+            if outcome == HIT_BOMB:
+                print(
+                    f"💥 BOOM! You hit a bomb. Game Over! {('Final Score: ' + str(state.score)) if not trial else 'Have fun playing the real game!'}"
+                )
+                return state.score if not trial else -1
 
-        os.system('cls' if os.name == 'nt' else 'clear')
-        print_board(board, snake, food_set, bombs, trial)
+        renderer.draw(state, message)
 
 
 file = os.path.join(os.path.dirname(__file__), "leaderboard.txt")
 
-def _load_leaderboard(file_path=None):
-    if file_path is None:
-        file_path = file
-    leaderboard = []
-    try:
-        with open(file_path, 'r') as fh:
-            for line in fh:
-                line = line.strip()
-                if not line or ':' not in line:
-                    continue
-                name_part, score_part = line.split(':', 1)
-                try:
-                    leaderboard.append([name_part.strip(), int(score_part.strip())])
-                except ValueError:
-                    continue
-    except FileNotFoundError:
-        return []
-    return leaderboard
-
-def _save_score(name, score, file_path=None):
-    if file_path is None:
-        file_path = file
-    with open(file_path, 'a') as fh:
-        fh.write(f"{name}:{score}\n")
-
-def run_game(food_count=3, bomb_count=5, trial=False):
-    leaderboard_sorted = []
+def _load_leaderboard(store, capacity=5):
+    board = store.load(capacity)
+    print_parse_errors(board, store.path)
+    return board
+
+def run_game(food_count=3, bomb_count=5, trial=False, width=BOARD_WIDTH, height=BOARD_HEIGHT, leaderboard_file=None, cell_style=None, seed=None, replay_dir=None,
+             max_undos=MAX_UNDOS):
+    store = open_store(leaderboard_file or file)
+    seeds = random.Random(seed)
+    # loaded once; later rounds only append and read back the new lines
+    leaderboard = _load_leaderboard(store)
+    leaderboard_sorted = leaderboard.top(5)
     while True:
         if not trial:
             name = input("Enter your name for the leaderboard (or leave blank for 'Anonymous'): ").strip()
             if not name:
                 name = 'Anonymous'
 
-        score = _game_loop(food_count, bomb_count, trial=trial)
+        score = _game_loop(food_count, bomb_count, trial=trial, width=width, height=height, cell_style=cell_style,
+                           seed=seeds.getrandbits(64), replay_dir=replay_dir, max_undos=max_undos)
         if trial and score == -1:
             play_real = ask_yes_no("Practice round ended — start the full game now?", default=True)
             if play_real:
                 print("\nEnter settings for the full game (press Enter to keep current values):\n")
                 food_count = ask_int("How many food items?", default=food_count, min_value=1, max_value=100)
                 bomb_count = ask_int("How many bombs?", default=bomb_count, min_value=0, max_value=200)
+                width = ask_int("Board width?", default=width, min_value=3, max_value=MAX_BOARD_SIZE)
+                height = ask_int("Board height?", default=height, min_value=3, max_value=MAX_BOARD_SIZE)
                 trial = False
                 continue
             else:
@@ -186,8 +264,10 @@ def run_game(food_count=3, bomb_count=5, trial=False):
                 break
 
         if score != -1:
-            _save_score(name, score)
-            leaderboard_sorted = heapSort(_load_leaderboard())[:5]
+            store.add(name, score)
+            store.flush()
+            store.sync(leaderboard)
+            leaderboard_sorted = leaderboard.top(5)
 
         print("\nCurrent Leaderboard:\n")
         if not leaderboard_sorted:
@@ -205,4 +285,5 @@ def run_game(food_count=3, bomb_count=5, trial=False):
                 for i, (n, s) in enumerate(leaderboard_sorted, start=1):
                     print(f" {i:>2}. {n:<20} {s} pts")
             print("\nThanks for playing SnakeSweeper!\n")
-            break
\ No newline at end of file
+            break
+    store.close()
\ No newline at end of file
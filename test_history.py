@@ -0,0 +1,112 @@
+import random
+from gamelogic import GameState, RECORD_SIZE, MOVED, ATE
+from replay import Replay, ReplayRecorder, apply_event, DIRECTION_CODES, UNDO, REDO, RESET
+
+MOVES = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
+def signature(state):
+    return (state.snake.to_list(), sorted(state.food_set), sorted(state.bombs), state.score,
+            state.remaining_undos, state.move_count, state.over)
+
+def board(state):
+    return (state.snake.to_list(), sorted(state.food_set), state.score)
+
+def safe_move(state, rng):
+    head_x, head_y = state.snake.head_coordinates()
+    options = [(dx, dy) for dx, dy in MOVES
+               if 0 <= head_x + dx < state.width and 0 <= head_y + dy < state.height
+               and not state.snake.contains((head_x + dx, head_y + dy))
+               and (head_x + dx, head_y + dy) not in state.bombs]
+    return rng.choice(options) if options else MOVES[0]
+
+def play(state, rng, events):
+    # random moves mixed with undos, redos and the odd long run of undos;
+    # yields after every event with the event codes so far
+    codes = []
+    burst = 0
+    for _ in range(events):
+        if burst:
+            burst -= 1
+            code = UNDO
+        else:
+            roll = rng.random()
+            if roll < 0.003:
+                burst = rng.choice([20, 600])
+                code = UNDO
+            elif roll < 0.12:
+                code = UNDO
+            elif roll < 0.2:
+                code = REDO
+            elif state.over:
+                code = RESET
+            else:
+                code = DIRECTION_CODES[safe_move(state, rng)]
+        apply_event(state, code)
+        codes.append(code)
+        yield codes
+
+def test_undo_redo_travel_match_a_fresh_replay():
+    for seed, max_undos in [(1, None), (2, None), (3, 5)]:
+        state = GameState(4, 6, trial=True, width=10, height=8, seed=seed, max_undos=max_undos)
+        rng = random.Random(seed)
+        # the board at each move of the current line, dropped past a new step
+        line = {0: board(state)}
+        for codes in play(state, rng, 3000):
+            code = codes[-1]
+            if code == RESET:
+                line = {0: board(state)}
+            elif code not in (UNDO, REDO) and not state.over:
+                for move in [move for move in line if move >= state.move_count]:
+                    del line[move]
+            if state.move_count in line:
+                assert line[state.move_count] == board(state), (seed, len(codes))
+            line[state.move_count] = board(state)
+        fresh = GameState(4, 6, trial=True, width=10, height=8, seed=seed, max_undos=max_undos)
+        for code in codes:
+            apply_event(fresh, code)
+        assert signature(fresh) == signature(state)
+        end = state.history_base + len(state.history) // RECORD_SIZE
+        for move in rng.sample(range(state.history_base, end + 1), min(40, end + 1 - state.history_base)):
+            assert state.travel(move) == move
+            if move in line:
+                assert line[move] == board(state), (seed, move)
+
+def test_history_stays_within_budget():
+    for budget in (4096, 24 * 300, 1 << 14):
+        state = GameState(30, 0, width=40, height=30, seed=7, max_undos=None, history_budget=budget)
+        rng = random.Random(7)
+        trimmed = False
+        for _ in range(4000):
+            if state.step(safe_move(state, rng)) not in (MOVED, ATE):
+                state.reset()
+            used = len(state.history) * state.history.itemsize + state.checkpoint_bytes
+            assert used <= budget, (budget, used)
+            trimmed = trimmed or state.history_base > 0
+        assert trimmed
+
+def test_snapshot_round_trip():
+    state = GameState(4, 6, trial=True, width=10, height=8, seed=4, max_undos=None)
+    for _ in play(state, random.Random(4), 500):
+        pass
+    copy = GameState.restore(state.snapshot())
+    assert signature(copy) == signature(state)
+    assert copy.history == state.history and copy.checkpoints == state.checkpoints
+    for _ in range(10):
+        assert copy.undo() == state.undo()
+        assert signature(copy) == signature(state)
+
+def test_replay_matches_live_game(tmp_path):
+    for seed, max_undos in [(5, None), (6, 3), (7, None)]:
+        state = GameState(3, 5, trial=True, width=20, height=16, seed=seed, max_undos=max_undos)
+        # the 600-undo runs reach past a keyframe's undo window, so some
+        # positions have to be rebuilt from an earlier keyframe
+        path = tmp_path / f"{seed}.ssr"
+        recorder = ReplayRecorder(str(path), state)
+        live = {0: signature(state)}
+        for codes in play(state, random.Random(seed), 6000):
+            live[len(codes)] = signature(state)
+        recorder.close()
+        replay = Replay.load(str(path))
+        assert len(replay) == 6000 and replay.keyframes
+        for index in list(range(0, 6001, 37)) + [6000]:
+            assert signature(replay.state_at(index)) == live[index], (seed, index)
@@ -0,0 +1,62 @@
+import itertools
+import random
+from gamelogic import GameState, count_adjacent_bombs, MOVED, ATE
+from inference import BombInference
+
+MOVES = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
+def brute_force(engine, bomb_count):
+    # every placement of the bombs that agrees with what the engine was told
+    width, height = engine.width, engine.height
+    cells = [(x, y) for y in range(height) for x in range(width)]
+    candidates = [pos for pos in cells if engine._cell(pos) not in engine.safe]
+    seen = [((cell % width, cell // width), count) for cell, count in engine.counts.items()]
+    total = 0
+    hits = dict.fromkeys(cells, 0)
+    for combo in itertools.combinations(candidates, bomb_count):
+        bombs = set(combo)
+        if all(count_adjacent_bombs(x, y, bombs) == count for (x, y), count in seen):
+            total += 1
+            for pos in combo:
+                hits[pos] += 1
+    return {pos: n / total for pos, n in hits.items()}
+
+def play(seed, width, height, bomb_count, moves):
+    state = GameState(2, bomb_count, width=width, height=height, seed=seed, max_undos=None)
+    engine = BombInference.for_state(state)
+    rng = random.Random(seed)
+    yield state, engine
+    for _ in range(moves):
+        head_x, head_y = state.snake.head_coordinates()
+        options = [(dx, dy) for dx, dy in MOVES
+                   if 0 <= head_x + dx < width and 0 <= head_y + dy < height
+                   and not state.snake.contains((head_x + dx, head_y + dy))
+                   and (head_x + dx, head_y + dy) not in state.bombs]
+        if not options:
+            return
+        if state.step(rng.choice(options)) not in (MOVED, ATE):
+            return
+        engine.sync(state)
+        yield state, engine
+
+def test_matches_brute_force_on_small_boards():
+    for seed in range(150):
+        for state, engine in play(seed, 5, 5, 4, 6):
+            exact = brute_force(engine, len(state.bombs))
+            for pos, p in exact.items():
+                assert abs(engine.probability(pos) - p) < 1e-9, (seed, pos, engine.probability(pos), p)
+
+def test_certain_cells_agree_with_board():
+    for seed in range(20):
+        for state, engine in play(seed, 12, 10, 20, 60):
+            for cell in engine.mines:
+                assert (cell % state.width, cell // state.width) in state.bombs
+            for cell in engine.safe:
+                assert (cell % state.width, cell // state.width) not in state.bombs
+
+def test_trial_mode_knows_every_bomb():
+    state = GameState(2, 6, trial=True, width=8, height=6, seed=3)
+    engine = BombInference.for_state(state)
+    for y in range(state.height):
+        for x in range(state.width):
+            assert engine.probability((x, y)) == (1.0 if (x, y) in state.bombs else 0.0)